@@ -0,0 +1,55 @@
+"""Shared FastAPI dependencies: request time and the start/end/hours window."""
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from fastapi import Depends, Query
+
+from .services.weather import EU_CPH
+
+@lru_cache(maxsize=4096)
+def _parse_iso_cached(s: str) -> datetime:
+    dt = datetime.fromisoformat(s)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=EU_CPH)
+    return dt.astimezone(timezone.utc)
+
+def parse_iso_local_to_utc(s: str | None, default: datetime | None) -> datetime | None:
+    """
+    Parse ISO8601; if naive, assume Europe/Copenhagen, then convert to UTC.
+    Clients tend to resend the same window, so parsed strings are memoized.
+    """
+    if s is None:
+        return default
+    return _parse_iso_cached(s)
+
+def request_now() -> datetime:
+    """'now' for the current request: evaluated once per request; every dependant in that request gets the same value."""
+    return datetime.now(timezone.utc)
+
+def time_window(max_hours: int = 168):
+    """
+    Dependency factory for the shared start/end/hours query params.
+    Resolves them to a UTC (start, end) window; naive ISO → Europe/Copenhagen.
+    """
+    def _window(
+        start: str | None = Query(None, description="ISO8601, e.g. '2025-03-01T00:00:00'. Naive → Europe/Copenhagen."),
+        end: str | None = Query(None, description="ISO8601, e.g. '2025-04-01T00:00:00'. Naive → Europe/Copenhagen."),
+        hours: int = Query(24, ge=1, le=max_hours, description="Used only if start/end not provided; last N hours"),
+        now: datetime = Depends(request_now),
+    ) -> tuple[datetime, datetime]:
+        if start or end:
+            start_dt = parse_iso_local_to_utc(start, None)
+            end_dt = parse_iso_local_to_utc(end, now if start_dt is not None else None)
+            if start_dt is None:
+                start_dt = (end_dt or now) - timedelta(hours=hours)
+            if end_dt is None:
+                end_dt = now
+        else:
+            end_dt = now
+            start_dt = now - timedelta(hours=hours)
+        return start_dt, end_dt
+    return _window
+
+window_168h = time_window(168)
+window_48h = time_window(48)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+
+from ..deps import request_now, window_168h, window_48h
+from ..series import Series, combined_points, nearest_values, pv_cached, summaries, wind_and_pv
+from ..services.weather import historic_power
+from ..services.wind_forecast import forecast_wind_power
+from ..services.wind_live import current_wind_power, historic_wind_power
+
+router = APIRouter()
+
+# Endpoints returning point lists hand FastAPI a ready ORJSONResponse: returning
+# the dict would first run jsonable_encoder over every point in Python.
+
+@router.get("/wind/forecast_live")
+def wind_forecast_live(
+    hours: int = Query(48, ge=1, le=168),
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+):
+    points = forecast_wind_power(lat, lon, hours=hours)
+    return ORJSONResponse({"ok": True, "hours": hours, "points": points})
+
+@router.get("/power/combined_forecast")
+def power_combined_forecast(
+    load_kw: float = Query(0.0, ge=0.0),
+    hours: int = Query(24, ge=1, le=72),
+    # location
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    # PV params (PVGIS proxy)
+    peak_kwp: float = Query(2.0, ge=0.1),
+    tilt_deg: float = Query(35.0),
+    azimuth_deg: float = Query(0.0),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0),
+):
+    # wind forecast (hourly)
+    wind = forecast_wind_power(lat, lon, hours=hours)           # [{ts, wind_ms, wind_kw}]
+    if not wind:
+        return {"ok": False, "reason": "no_wind_forecast"}
+    start_dt, end_dt = wind[0]["ts"], wind[-1]["ts"]
+
+    # solar proxy from PVGIS for covering years (take same months/days across years)
+    solar_all = pv_cached(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_dt.year, end_dt.year)
+    # nearest-join on wind timestamps
+    w = Series.from_rows(wind, "wind_kw")
+    points = combined_points(w, nearest_values(solar_all, w.ts), load_kw)
+    return ORJSONResponse({"ok": True, "start_utc": start_dt.isoformat(), "end_utc": end_dt.isoformat(),
+                           "load_kw": float(load_kw), "points": points})
+
+
+@router.get("/power/current_wind_vs_load")
+def power_current_wind_vs_load(
+    load_kw: float = Query(0.0, ge=0.0),
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None)
+):
+    """
+    'Current' wind vs load:
+      1) Try latest DMI metObs (observed).
+      2) If none available (e.g., outage), fall back to first hour of DMI forecast.
+    """
+    # 1) Observed (metObs)
+    obs = current_wind_power(lat, lon, station_id)
+    if obs.get("available"):
+        wind_kw = float(obs["wind_kw"])
+        net_kw = wind_kw - load_kw
+        return {
+            "available": True,
+            "now_utc": obs["now_utc"],
+            "source": {"type": "observed", **obs.get("source", {})},
+            "wind_ms": float(obs["wind_ms"]),
+            "wind_kw": wind_kw,
+            "requested_load_kw": float(load_kw),
+            "net_kw": net_kw,
+            "meets_load": net_kw >= 0,
+        }
+
+    # 2) Forecast fallback (first forecast hour)
+    fc = forecast_wind_power(lat, lon, hours=1)
+    if fc:
+        first = fc[0]
+        wind_kw = float(first["wind_kw"])
+        net_kw = wind_kw - load_kw
+        return {
+            "available": True,
+            "now_utc": first["ts"].isoformat(),
+            "source": {"type": "forecast", "provider": "dmi_edr"},
+            "wind_ms": float(first["wind_ms"]),
+            "wind_kw": wind_kw,
+            "requested_load_kw": float(load_kw),
+            "net_kw": net_kw,
+            "meets_load": net_kw >= 0,
+        }
+
+    # No data at all
+    return {"available": False, "reason": "no_observation_or_forecast"}
+
+@router.get("/power/historic")
+def power_historic(
+    load_kw: float = Query(0.0, ge=0.0),
+    window: tuple[datetime, datetime] = Depends(window_168h),
+    now: datetime = Depends(request_now),
+):
+    """
+    Returns historical wind power points and net kW over a time window.
+
+    Priority:
+      - If start and end are provided, use that range.
+      - Else use 'hours' ending at now (default 24h).
+    """
+    start_dt, end_dt = window
+    return ORJSONResponse(historic_power(start_dt, end_dt, load_kw=load_kw, now_utc=now))
+
+
+# --- LIVE WIND (DMI) ----------------------------------------------------------
+@router.get("/wind/current_live")
+def wind_current_live(
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None, description="Optional DMI stationId; omit to auto-pick nearest"),
+):
+    return current_wind_power(lat, lon, station_id)
+
+@router.get("/wind/historic_live")
+def wind_historic_live(
+    window: tuple[datetime, datetime] = Depends(window_168h),
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None),
+):
+    start_dt, end_dt = window
+
+    points = historic_wind_power(lat, lon, station_id, start_dt, end_dt)
+    return ORJSONResponse({"ok": True, "start_utc": start_dt.isoformat(), "end_utc": end_dt.isoformat(), "points": points})
+
+# --- HISTORIC SOLAR (PVGIS) ---------------------------------------------------
+@router.get("/solar/historic")
+def solar_historic(
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    peak_kwp: float = Query(2.0, ge=0.1, description="Simulated DC size (kWp)"),
+    tilt_deg: float = Query(35.0),
+    azimuth_deg: float = Query(0.0, description="0=south, -90=east, 90=west"),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0),
+    start_year: int = Query(2019),
+    end_year: int = Query(2025),
+):
+    points = pv_cached(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year).rows("pv_kw")
+    return ORJSONResponse({"ok": True, "years": [start_year, end_year], "points": points})
+
+# --- COMBINED (LIVE WIND + PVGIS SOLAR) --------------------------------------
+@router.get("/power/combined_live")
+async def power_combined_live(
+    load_kw: float = Query(0.0, ge=0.0),
+    hours: int = Query(24, ge=1, le=48),
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None),
+    peak_kwp: float = Query(2.0, ge=0.1),
+    tilt_deg: float = Query(35.0),
+    azimuth_deg: float = Query(0.0),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0),
+    now: datetime = Depends(request_now),
+):
+    start_dt = now - timedelta(hours=hours)
+    end_dt = now
+    # wind + solar over covering years, fetched concurrently
+    wind, solar = await wind_and_pv(lat, lon, station_id, start_dt, end_dt,
+                                    peak_kwp, tilt_deg, azimuth_deg, losses_pct)
+
+    s_kw = nearest_values(solar, wind.ts)
+    points = combined_points(wind, s_kw, load_kw)
+    return ORJSONResponse({
+        "ok": True,
+        "start_utc": start_dt.isoformat(),
+        "end_utc": end_dt.isoformat(),
+        "load_kw": float(load_kw),
+        "summary": summaries(wind.ts, wind.kw, s_kw),
+        "points": points,
+    })
+
+
+
+@router.get("/power/combined_historic")
+async def power_combined_historic(
+    load_kw: float = Query(0.0, ge=0.0, description="Base load to compare against (kW)"),
+    window: tuple[datetime, datetime] = Depends(window_48h),
+    # location
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None, description="Optional DMI stationId; omit to auto-pick nearest"),
+    # PV parameters
+    peak_kwp: float = Query(2.0, ge=0.1, description="Simulated DC size (kWp)"),
+    tilt_deg: float = Query(35.0, description="PV tilt (degrees from horizontal)"),
+    azimuth_deg: float = Query(0.0, description="0=south, -90=east, 90=west"),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0, description="Total system losses (%)"),
+):
+    start_dt, end_dt = window
+
+    # --- wind (DMI) in [start_dt, end_dt] and solar (PVGIS) for the covering years, concurrently
+    wind, solar = await wind_and_pv(lat, lon, station_id, start_dt, end_dt,
+                                    peak_kwp, tilt_deg, azimuth_deg, losses_pct)
+
+    # Build nearest-join: take wind timestamps as the backbone (hourly), attach nearest solar hour
+    s_kw = nearest_values(solar, wind.ts)
+    points = combined_points(wind, s_kw, load_kw)
+
+    return ORJSONResponse({
+        "ok": True,
+        "start_utc": start_dt.isoformat(),
+        "end_utc": end_dt.isoformat(),
+        "load_kw": float(load_kw),
+        "params": {
+            "lat": lat, "lon": lon, "station_id": station_id,
+            "peak_kwp": peak_kwp, "tilt_deg": tilt_deg, "azimuth_deg": azimuth_deg, "losses_pct": losses_pct
+        },
+        "summary": summaries(wind.ts, wind.kw, s_kw),
+        "points": points,  # hourly-ish points; energy per point ≈ kWh for that hour
+    })
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from datetime import datetime
+
+import numpy as np
+from fastapi import APIRouter, Depends, Query
+
+from ..deps import window_168h
+from ..series import Series, find_windows, interp_series, nearest_values, pv_cached, wind_and_pv, wind_series
+
+router = APIRouter()
+
+@router.get("/solar_historic")
+def schedule_solar_historic(
+    power_w: float = Query(..., gt=0, description="Extra power demand during the job (W)"),
+    duration_min: int = Query(..., gt=0, description="Job duration (minutes)"),
+    require_power_floor: bool = Query(False, description="Require PV power ≥ demand at every step"),
+    step_minutes: int = Query(5, ge=1, le=60, description="Scheduling resolution"),
+    # time window
+    window: tuple[datetime, datetime] = Depends(window_168h),
+    # PV params
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    peak_kwp: float = Query(2.0, ge=0.1),
+    tilt_deg: float = Query(35.0),
+    azimuth_deg: float = Query(0.0),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0),
+):
+    need_kwh = (power_w / 1000.0) * (duration_min / 60.0)
+    start_dt, end_dt = window
+
+    # PVGIS hourly
+    solar = pv_cached(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_dt.year, end_dt.year)
+    # clip to window
+    solar = solar.between(start_dt, end_dt)
+    if len(solar) < 2:
+        return {"ok": True, "windows": [], "reason": "insufficient data"}
+
+    # resample & search
+    windows = find_windows(interp_series(solar, step_minutes), step_minutes, need_kwh,
+                            min_power_kw=(power_w/1000.0) if require_power_floor else None)
+    return {
+        "ok": True,
+        "job": {"power_w": power_w, "duration_min": duration_min, "need_kwh": need_kwh},
+        "params": {"lat": lat, "lon": lon, "peak_kwp": peak_kwp, "tilt": tilt_deg, "azimuth": azimuth_deg, "losses_pct": losses_pct},
+        "windows": windows[:10],
+    }
+
+@router.get("/wind_historic")
+def schedule_wind_historic(
+    power_w: float = Query(..., gt=0),
+    duration_min: int = Query(..., gt=0),
+    require_power_floor: bool = Query(False),
+    step_minutes: int = Query(5, ge=1, le=60),
+    window: tuple[datetime, datetime] = Depends(window_168h),
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None),
+):
+    need_kwh = (power_w / 1000.0) * (duration_min / 60.0)
+    start_dt, end_dt = window
+
+    wind = wind_series(lat, lon, station_id, start_dt, end_dt)  # hourly-ish
+    if len(wind) < 2:
+        return {"ok": True, "windows": [], "reason": "insufficient data"}
+
+    windows = find_windows(interp_series(wind, step_minutes), step_minutes, need_kwh,
+                            min_power_kw=(power_w/1000.0) if require_power_floor else None)
+    return {
+        "ok": True,
+        "job": {"power_w": power_w, "duration_min": duration_min, "need_kwh": need_kwh},
+        "params": {"lat": lat, "lon": lon, "station_id": station_id},
+        "windows": windows[:10],
+    }
+
+@router.get("/combined_historic")
+async def schedule_combined_historic(
+    power_w: float = Query(..., gt=0),
+    duration_min: int = Query(..., gt=0),
+    require_power_floor: bool = Query(False, description="Require total_kw ≥ demand at every step"),
+    step_minutes: int = Query(5, ge=1, le=60),
+    window: tuple[datetime, datetime] = Depends(window_168h),
+    # location + sources
+    lat: float = Query(57.0488),
+    lon: float = Query(9.9217),
+    station_id: str | None = Query(None),
+    peak_kwp: float = Query(2.0, ge=0.1),
+    tilt_deg: float = Query(35.0),
+    azimuth_deg: float = Query(0.0),
+    losses_pct: float = Query(14.0, ge=0.0, le=40.0),
+):
+    need_kwh = (power_w / 1000.0) * (duration_min / 60.0)
+    start_dt, end_dt = window
+
+    # get both sources (hourly-ish), concurrently
+    wind, solar = await wind_and_pv(lat, lon, station_id, start_dt, end_dt,
+                                    peak_kwp, tilt_deg, azimuth_deg, losses_pct)
+    wind = wind.between(start_dt, end_dt)
+    solar = solar.between(start_dt, end_dt)
+    if len(wind) < 2 and len(solar) < 2:
+        return {"ok": True, "windows": [], "reason": "insufficient data"}
+
+    # resample both to same grid, then sum
+    w = interp_series(wind, step_minutes)
+    s = interp_series(solar, step_minutes)
+    # build unified timeline, nearest attach from each source
+    grid = np.union1d(w.ts, s.ts)
+    total = Series(grid, nearest_values(w, grid) + nearest_values(s, grid))
+
+    windows = find_windows(total, step_minutes, need_kwh,
+                            min_power_kw=(power_w/1000.0) if require_power_floor else None)
+    return {
+        "ok": True,
+        "job": {"power_w": power_w, "duration_min": duration_min, "need_kwh": need_kwh},
+        "params": {"lat": lat, "lon": lon, "peak_kwp": peak_kwp, "tilt": tilt_deg, "azimuth": azimuth_deg, "losses_pct": losses_pct, "station_id": station_id},
+        "windows": windows[:10],
+    }
@@ -0,0 +1,185 @@
+"""Array-backed series helpers shared by the power and schedule routers."""
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import anyio
+import numpy as np
+
+from .services.solar_pvgis import historic_pv_arrays
+from .services.wind_live import historic_wind_arrays
+
+def from_unix(t: float) -> datetime:
+    return datetime.fromtimestamp(t, tz=timezone.utc)
+
+def iso_utc(ts: np.ndarray) -> list:
+    """
+    Response timestamps for a whole axis in one batch.
+    Whole-second axes are formatted by NumPy exactly as orjson renders UTC datetimes;
+    anything with sub-second parts falls back to datetime objects.
+    """
+    if np.array_equal(ts, np.floor(ts)):
+        return np.char.add(np.datetime_as_string(ts.astype("datetime64[s]"), unit="s"), "+00:00").tolist()
+    return [from_unix(t) for t in ts.tolist()]
+
+@dataclass(frozen=True)
+class Series:
+    """Time series as parallel arrays: ts = unix seconds (UTC, ascending), kw = power."""
+    ts: np.ndarray
+    kw: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows, key: str) -> "Series":
+        n = len(rows)
+        return cls(np.fromiter((r["ts"].timestamp() for r in rows), dtype=np.float64, count=n),
+                   np.fromiter((float(r[key]) for r in rows), dtype=np.float64, count=n))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def between(self, start: datetime, end: datetime) -> "Series":
+        """Inclusive [start, end] slice; ts is sorted, so two binary searches and a view."""
+        lo = np.searchsorted(self.ts, start.timestamp(), side="left")
+        hi = np.searchsorted(self.ts, end.timestamp(), side="right")
+        return Series(self.ts[lo:hi], self.kw[lo:hi])
+
+    def rows(self, key: str) -> list[dict]:
+        """Materialize [{'ts', key}] for the response."""
+        return [{"ts": t, key: v} for t, v in zip(iso_utc(self.ts), self.kw.tolist())]
+
+@lru_cache(maxsize=128)
+def _pv_cached_key(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year) -> Series:
+    s = Series(*historic_pv_arrays(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year))
+    s.ts.flags.writeable = s.kw.flags.writeable = False
+    return s
+
+def pv_cached(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year) -> Series:
+    """PVGIS hourly pv_kw series, memoized per rounded parameter set (arrays are read-only)."""
+    return _pv_cached_key(round(lat, 4), round(lon, 4), round(peak_kwp, 4), round(tilt_deg, 4),
+                          round(azimuth_deg, 4), round(losses_pct, 4), int(start_year), int(end_year))
+
+def wind_series(lat, lon, station_id, start_dt, end_dt) -> Series:
+    ts, _, wind_kw = historic_wind_arrays(lat, lon, station_id, start_dt, end_dt)
+    return Series(ts, wind_kw)
+
+async def wind_and_pv(lat, lon, station_id, start_dt, end_dt,
+                      peak_kwp, tilt_deg, azimuth_deg, losses_pct) -> tuple[Series, Series]:
+    """DMI wind and PVGIS solar for the window, fetched side by side in worker threads."""
+    return tuple(await asyncio.gather(
+        anyio.to_thread.run_sync(wind_series, lat, lon, station_id, start_dt, end_dt),
+        anyio.to_thread.run_sync(pv_cached, lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct,
+                                 start_dt.year, end_dt.year),
+    ))
+
+def nearest_values(src: Series, query: np.ndarray) -> np.ndarray:
+    """Values of `src` at the timestamps closest to each query time (ties → earlier; clamps at the ends)."""
+    if len(src) == 0:
+        return np.zeros(len(query))
+    idx = np.searchsorted(src.ts, query)
+    lo = np.clip(idx - 1, 0, len(src) - 1)
+    hi = np.clip(idx, 0, len(src) - 1)
+    pick_hi = (query - src.ts[lo]) > (src.ts[hi] - query)
+    return np.where(pick_hi, src.kw[hi], src.kw[lo])
+
+def combined_points(wind: Series, solar_kw: np.ndarray, load_kw: float) -> list[dict]:
+    tot = wind.kw + solar_kw
+    net = tot - load_kw
+    return [
+        {"ts": ts, "wind_kw": wk, "solar_kw": sk, "total_kw": t, "net_kw": nk, "meets_load": m}
+        for ts, wk, sk, t, nk, m in zip(iso_utc(wind.ts), wind.kw.tolist(), solar_kw.tolist(),
+                                        tot.tolist(), net.tolist(), (tot >= load_kw).tolist())
+    ]
+
+def summaries(ts: np.ndarray, wind_kw: np.ndarray, solar_kw: np.ndarray) -> dict:
+    """Daily and total kWh summaries from hourly wind/solar kW arrays on the unix-second axis `ts`."""
+    if len(ts) == 0:
+        return {"energy_total_kwh": 0.0, "energy_wind_kwh": 0.0, "energy_solar_kwh": 0.0, "days": []}
+    # hourly averages → kWh per row ~ kw * 1h; one pass buckets rows into UTC days
+    day_no, inv = np.unique(ts // 86400, return_inverse=True)
+    d_wind = np.bincount(inv, weights=wind_kw)
+    d_solar = np.bincount(inv, weights=solar_kw)
+    # totals from the (few) daily sums
+    e_wind = float(d_wind.sum())
+    e_solar = float(d_solar.sum())
+    return {
+        "energy_total_kwh": e_wind + e_solar,
+        "energy_wind_kwh": e_wind,
+        "energy_solar_kwh": e_solar,
+        "days": [
+            {"day": from_unix(d * 86400).date().isoformat(), "kwh_total": w + sl, "kwh_wind": w, "kwh_solar": sl}
+            for d, w, sl in zip(day_no.tolist(), d_wind.tolist(), d_solar.tolist())
+        ],
+    }
+
+def interp_series(series: Series, step_minutes: int) -> Series:
+    """
+    Linear interpolate a series to fixed spacing 'step_minutes' from its first sample;
+    the last sample is kept even when it falls between steps.
+    """
+    if len(series) == 0:
+        return series
+    new_t = np.arange(series.ts[0], series.ts[-1] + 1e-6, step_minutes * 60.0)
+    if series.ts[-1] - new_t[-1] > 1e-6:
+        # an off-grid final sample still closes the series, as the per-segment walk did
+        new_t = np.append(new_t, series.ts[-1])
+    return Series(new_t, np.interp(new_t, series.ts, series.kw))
+
+def sum_energy_kwh(series: list[float], step_minutes: int) -> float:
+    """Sum discrete series (kW) at fixed step to kWh."""
+    return sum(series) * (step_minutes / 60.0)
+
+def _next_below(p: np.ndarray, floor: float) -> np.ndarray:
+    """For each i, the first index k >= i with p[k] < floor (len(p) if none)."""
+    n = len(p)
+    bad = np.where(p + 1e-12 < floor, np.arange(n), n)
+    return np.minimum.accumulate(bad[::-1])[::-1]
+
+def find_windows(
+    series: Series,                      # on a fixed step grid
+    step_minutes: int,
+    need_kwh: float,
+    min_power_kw: float | None = None,   # if set, require every step ≥ this
+    max_windows: int = 10,
+) -> list[dict]:
+    """
+    Sliding-window search for windows that meet energy (and optional power floor).
+    Returns [{'start','end','kwh','avg_kw','min_kw','steps'}].
+    """
+    if len(series) == 0:
+        return []
+    step_h = step_minutes / 60.0
+    ts, p = series.ts, series.kw
+    n = len(p)
+    # prefix sums for O(1) energy in any window
+    pref = np.concatenate(([0.0], np.cumsum(p * step_h)))
+
+    # starts after last_i can't collect need_kwh before the series ends; without a
+    # floor every remaining start is feasible, so only the first max_windows matter
+    last_i = int(np.searchsorted(pref, pref[-1] - need_kwh + 1e-12, side="right")) - 1
+    n_starts = min(n, last_i + 1)
+    if min_power_kw is None:
+        n_starts = min(n_starts, max_windows)
+
+    # for every candidate start i at once: first j where energy(i,j) >= need_kwh
+    i = np.arange(max(n_starts, 0))
+    j = np.maximum(np.searchsorted(pref, pref[i] + need_kwh - 1e-12, side="left"), i + 1)
+    ok = j <= n
+    i, j = i[ok], j[ok]
+
+    if min_power_kw is not None:
+        # power floor check: window ok iff no sub-floor step occurs before j
+        ok = _next_below(p, min_power_kw)[i] >= j
+        i, j = i[ok], j[ok]
+    # only the reported windows need their minimum
+    i, j = i[:max_windows], j[:max_windows]
+    min_kw = np.array([p[a:b].min() for a, b in zip(i, j)])
+    e = pref[j] - pref[i]
+    steps = j - i
+    step_s = step_minutes * 60.0
+    return [
+        {"start": from_unix(ts[a]), "end": from_unix(ts[b - 1] + step_s),
+         "kwh": ek, "avg_kw": ek / (s * step_h), "min_kw": m, "steps": s}
+        for a, b, ek, s, m in zip(i.tolist(), j.tolist(), e.tolist(), steps.tolist(), min_kw.tolist())
+    ]
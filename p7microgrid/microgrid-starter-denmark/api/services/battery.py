@@ -1,77 +1,128 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import List, Dict
+import numpy as np
 from ..config import (
     BATTERY_CAPACITY_KWH, INITIAL_SOC_KWH, CHARGE_EFF, DISCHARGE_EFF, SIM_STEP
 )
+from .weather import Forecast, as_forecast, to_ns
 
+_STEP_NS = SIM_STEP // timedelta(microseconds=1) * 1000
+_STEP_H = SIM_STEP.total_seconds()/3600.0
+
+def _gen_per_step(forecast: Forecast, start: datetime) -> np.ndarray:
+    """
+    wind_kw for each SIM_STEP from `start`: the latest sample at or before the step
+    (the first sample before the forecast begins). Runs up to and including the first
+    step starting at/after the last sample; a 0/1-sample forecast gives a single step.
+    """
+    start_ns = to_ns(start)
+    last_ns = int(forecast.ts_ns[-1]) - start_ns if len(forecast) > 1 else 0
+    q, r = divmod(max(last_ns, 0), _STEP_NS)
+    n_steps = q + (1 if r else 0) + 1
+    if not len(forecast):
+        return np.zeros(n_steps)
+    steps_ns = start_ns + np.arange(n_steps, dtype=np.int64) * _STEP_NS
+    idx = np.searchsorted(forecast.ts_ns, steps_ns, side="right") - 1
+    return forecast.wind_kw[np.maximum(idx, 0)]
+
+@dataclass(slots=True)
 class BatterySim:
-    def __init__(self, capacity_kwh: float = BATTERY_CAPACITY_KWH, soc_kwh: float = INITIAL_SOC_KWH):
-        self.capacity = float(capacity_kwh)
-        self.soc = max(0.0, min(float(soc_kwh), self.capacity))
+    """Battery state in kWh; clone with dataclasses.replace(sim) before simulating."""
+    capacity: float = BATTERY_CAPACITY_KWH
+    soc: float = INITIAL_SOC_KWH
+
+    def __post_init__(self):
+        self.capacity = float(self.capacity)
+        self.soc = max(0.0, min(float(self.soc), self.capacity))
 
     def status(self, as_of: datetime) -> Dict:
         pct = 100.0 * self.soc / self.capacity if self.capacity > 0 else 0.0
         return {"now_soc_kwh": self.soc, "capacity_kwh": self.capacity, "soc_pct": pct, "as_of": as_of}
 
     def step(self, gen_kw: float, load_kw: float, dt: timedelta):
-        h = dt.total_seconds()/3600.0
+        self._step_h(gen_kw, load_kw, dt.total_seconds()/3600.0)
+
+    def _step_h(self, gen_kw: float, load_kw: float, h: float):
         # charge then discharge
         self.soc = min(self.capacity, self.soc + max(0.0, gen_kw) * CHARGE_EFF * h)
         self.soc = max(0.0, self.soc - max(0.0, load_kw) * h / DISCHARGE_EFF)
 
-        # ADD this method inside BatterySim
-        def simulate_until_targets(
-                self, forecast: List[Dict], targets_kwh: List[float], base_load_kw: float, start: datetime
-        ) -> Dict[float, Dict]:
-            """
-            Returns a map target_kwh -> { 'eta': datetime | None, 'reachable': bool }.
-            Does not mutate the caller if you run it on a clone.
-            """
-            remaining = sorted(set(round(t, 6) for t in targets_kwh if t > self.soc))
-            reached = {t: {"eta": start, "reachable": True} for t in targets_kwh if t <= self.soc}
+    def _soc_path(self, gen: np.ndarray, load_kw: float):
+        """
+        soc after every step, as step() would produce it, without mutating self.
+        Returns (soc, exact): the zero-floored cumulative sum is only exact until a
+        charge half-step first hits capacity, so steps from `exact` on must be stepped.
+        """
+        charge = np.maximum(gen, 0.0) * CHARGE_EFF * _STEP_H
+        drain = max(0.0, load_kw) * _STEP_H / DISCHARGE_EFF
+        # floored at 0: the reflected walk S - min(0, running min S)
+        s_cum = self.soc + np.cumsum(charge - drain)
+        soc = s_cum - np.minimum(np.minimum.accumulate(s_cum), 0.0)
+        prev = np.concatenate(([self.soc], soc[:-1]))
+        clipped = np.flatnonzero(prev + charge > self.capacity)
+        return soc, (int(clipped[0]) if len(clipped) else len(gen))
 
-            i, t = 0, start
-            while remaining:
-                while i + 1 < len(forecast) and forecast[i + 1]["ts"] <= t:
-                    i += 1
-                gen_kw = forecast[i]["wind_kw"] if i < len(forecast) else 0.0
-                self.step(gen_kw=gen_kw, load_kw=base_load_kw, dt=SIM_STEP)
-                t += SIM_STEP
+    def simulate_until_targets(
+            self, forecast: Forecast | List[Dict], targets_kwh: List[float], base_load_kw: float, start: datetime
+    ) -> Dict[float, Dict]:
+        """
+        Returns a map target_kwh -> { 'eta': datetime | None, 'reachable': bool }.
+        Does not mutate the caller if you run it on a clone.
+        """
+        remaining = sorted(set(round(t, 6) for t in targets_kwh if t > self.soc))
+        reached = {t: {"eta": start, "reachable": True} for t in targets_kwh if t <= self.soc}
 
-                newly_reached = [tr for tr in remaining if self.soc >= tr - 1e-9]
-                for tr in newly_reached:
-                    reached[tr] = {"eta": t, "reachable": True}
-                remaining = [tr for tr in remaining if tr not in newly_reached]
+        if remaining:
+            gen = _gen_per_step(as_forecast(forecast), start)
+            n_steps = len(gen)
+            soc, exact = self._soc_path(gen, base_load_kw)
+            # first crossing of each target on the exact prefix; the rest are stepped below
+            # (ascending in tr, so the reached targets are always a prefix -> next_i pointer)
+            crossed = np.searchsorted(np.maximum.accumulate(soc[:exact]), np.asarray(remaining) - 1e-9, side="left")
+            next_i = int(np.count_nonzero(crossed < exact))
+            for tr, k in zip(remaining[:next_i], crossed[:next_i].tolist()):
+                reached[tr] = {"eta": start + (k + 1) * SIM_STEP, "reachable": True}
+            k_stop = int(crossed[next_i - 1]) if next_i == len(remaining) else exact - 1
+            self.soc = float(soc[k_stop]) if k_stop >= 0 else self.soc
 
-                if i >= len(forecast) - 1 and remaining:
-                    # Forecast exhausted; mark remaining as unreachable
-                    for tr in remaining:
-                        reached[tr] = {"eta": None, "reachable": False}
+            for k, g in enumerate(gen[exact:n_steps if next_i < len(remaining) else exact].tolist(), exact):
+                self._step_h(g, base_load_kw, _STEP_H)
+                while next_i < len(remaining) and self.soc >= remaining[next_i] - 1e-9:
+                    reached[remaining[next_i]] = {"eta": start + (k + 1) * SIM_STEP, "reachable": True}
+                    next_i += 1
+                if next_i == len(remaining):
                     break
 
-            # Fill any still-unset (e.g., empty forecast)
-            for tr in targets_kwh:
-                reached.setdefault(tr, {"eta": None, "reachable": self.soc >= tr - 1e-9})
-            return reached
+            # Forecast exhausted; mark remaining as unreachable
+            for tr in remaining[next_i:]:
+                reached[tr] = {"eta": None, "reachable": False}
+
+        # Fill any still-unset (e.g., empty forecast)
+        for tr in targets_kwh:
+            reached.setdefault(tr, {"eta": None, "reachable": self.soc >= tr - 1e-9})
+        return reached
 
-    def simulate_runtime(self, forecast: List[Dict], load_kw: float, start: datetime) -> Dict:
-        i, t = 0, start
+    def simulate_runtime(self, forecast: Forecast | List[Dict], load_kw: float, start: datetime) -> Dict:
         start_soc = self.soc
-        while True:
-            while i + 1 < len(forecast) and forecast[i + 1]["ts"] <= t:
-                i += 1
-            gen_kw = forecast[i]["wind_kw"] if i < len(forecast) else 0.0
-            self.step(gen_kw, load_kw, SIM_STEP)
-            t += SIM_STEP
-            if self.soc <= 1e-6:
-                return {
-                    "load_kw": load_kw, "start_soc_kwh": start_soc,
-                    "runtime_minutes": int((t - start).total_seconds() // 60),
-                    "end_time": t, "depleted": True
-                }
-            if i >= len(forecast) - 1:
-                return {
-                    "load_kw": load_kw, "start_soc_kwh": start_soc,
-                    "runtime_minutes": int((t - start).total_seconds() // 60),
-                    "end_time": t, "depleted": False
-                }
+        gen = _gen_per_step(as_forecast(forecast), start)
+        soc, exact = self._soc_path(gen, load_kw)
+        # no step can have been floored before the first depleted one, so soc is exact there
+        hit = np.flatnonzero(soc[:exact] <= 1e-6)
+        if len(hit):
+            k, depleted = int(hit[0]), True
+        else:
+            k, depleted = exact - 1, False
+        if k >= 0:
+            self.soc = float(soc[k])
+        if not depleted:
+            for k, g in enumerate(gen[exact:].tolist(), exact):
+                self._step_h(g, load_kw, _STEP_H)
+                if self.soc <= 1e-6:
+                    depleted = True
+                    break
+        return {
+            "load_kw": load_kw, "start_soc_kwh": start_soc,
+            "runtime_minutes": (k + 1) * _STEP_NS // 60_000_000_000,
+            "end_time": start + (k + 1) * SIM_STEP, "depleted": depleted
+        }
@@ -1,37 +1,29 @@
 from typing import List, Dict
 from datetime import datetime, timedelta
+import numpy as np
 from ..models import GreenWindow
+from .weather import Forecast, as_forecast
 
-def green_windows(forecast: List[Dict], load_kw: float, min_block_minutes=30) -> List[GreenWindow]:
+def green_windows(forecast: Forecast | List[Dict], load_kw: float, min_block_minutes=30) -> List[GreenWindow]:
     """
     Return windows where wind >= load for at least min_block_minutes.
     """
-    if not forecast:
+    fc = as_forecast(forecast)
+    n = len(fc)
+    if not n:
         return []
-    out = []
-    start = None
-    acc_margin = 0.0
-    count = 0
-    for i, r in enumerate(forecast):
-        margin = r["wind_kw"] - load_kw
-        if margin >= 0:
-            if start is None:
-                start = r["ts"]
-                acc_margin = 0.0
-                count = 0
-            acc_margin += margin
-            count += 1
-        else:
-            if start:
-                end = forecast[i]["ts"]
-                minutes = int((end - start).total_seconds() // 60)
-                if minutes >= min_block_minutes:
-                    out.append(GreenWindow(start=start, end=end, avg_margin_kw=acc_margin/max(count,1)))
-                start = None
-    # tail
-    if start:
-        end = forecast[-1]["ts"]
-        minutes = int((end - start).total_seconds() // 60)
-        if minutes >= min_block_minutes:
-            out.append(GreenWindow(start=start, end=end, avg_margin_kw=acc_margin/max(count,1)))
-    return out
+    margin = fc.wind_kw - load_kw
+    # runs of margin >= 0 as [start, stop) from the rising/falling edges
+    pos = (margin >= 0).view(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], pos, [0]))))
+    starts, stops = edges[::2], edges[1::2]
+    # a window ends at the first deficit row, or at the last row for the tail run
+    ends = np.minimum(stops, n - 1)
+    keep = (fc.ts_ns[ends] - fc.ts_ns[starts]) // 60_000_000_000 >= min_block_minutes
+    sums = np.add.reduceat(np.append(margin, 0.0), edges)[::2]
+    avg = sums / np.maximum(stops - starts, 1)
+    # fields are already datetimes/floats: model_construct skips per-window validation
+    return [
+        GreenWindow.model_construct(start=fc.rows[s]["ts"], end=fc.rows[e]["ts"], avg_margin_kw=a)
+        for s, e, a in zip(starts[keep].tolist(), ends[keep].tolist(), avg[keep].tolist())
+    ]
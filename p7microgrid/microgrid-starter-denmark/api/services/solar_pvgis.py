@@ -2,8 +2,11 @@
 from __future__ import annotations
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import numpy as np
+import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -14,16 +17,20 @@ load_dotenv()
 
 EU_CPH = ZoneInfo("Europe/Copenhagen")
 PVGIS_BASE = os.getenv("PVGIS_BASE", "https://re.jrc.ec.europa.eu/api/v5_3/seriescalc")
+PVGIS_MAX_PARALLEL = int(os.getenv("PVGIS_MAX_PARALLEL", "4"))  # concurrent per-year requests
 
-def _session() -> requests.Session:
+def _build_session() -> requests.Session:
     retry = Retry(total=5, connect=5, read=5, backoff_factor=0.8,
                   status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"],
                   raise_on_status=False)
     s = requests.Session()
-    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
+    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=20)
     s.mount("https://", a); s.mount("http://", a)
     return s
 
+# one pooled session per process: keeps TCP/TLS connections alive across requests
+_SESSION = _build_session()
+
 def _to_utc(ts: str) -> datetime:
     # PVGIS returns ISO times; treat as local if naive, then to UTC
     dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
@@ -31,7 +38,31 @@ def _to_utc(ts: str) -> datetime:
         dt = dt.replace(tzinfo=EU_CPH)
     return dt.astimezone(timezone.utc)
 
-def fetch_pvgis_series(
+def _times_to_unix(times: List[str]) -> np.ndarray:
+    """
+    Unix seconds for PVGIS hourly times ('YYYYMMDD:HHMM', naive → Europe/Copenhagen).
+    The fixed-width bytes are reshuffled into ISO so NumPy parses them all at once;
+    anything not in that layout goes through _to_utc row by row.
+    """
+    try:
+        b = np.array(times, dtype="S13")
+        raw = b.view(np.uint8).reshape(-1, 13)
+        if len(b) and len(max(times, key=len)) == 13 and (raw[:, 8] == ord(":")).all():
+            iso = np.empty((len(raw), 16), dtype=np.uint8)
+            iso[:, [4, 7, 10, 13]] = [ord("-"), ord("-"), ord("T"), ord(":")]
+            iso[:, 0:4], iso[:, 5:7], iso[:, 8:10] = raw[:, 0:4], raw[:, 4:6], raw[:, 6:8]
+            iso[:, 11:13], iso[:, 14:16] = raw[:, 9:11], raw[:, 11:13]
+            naive = pd.DatetimeIndex(iso.view("S16").ravel().astype("datetime64[m]"))
+            # same DST resolution as replace(tzinfo=EU_CPH): summer time when ambiguous,
+            # the pre-transition offset (wall clock +1h) when nonexistent
+            local = naive.tz_localize(EU_CPH, ambiguous=np.ones(len(naive), dtype=bool),
+                                      nonexistent=pd.Timedelta(hours=1))
+            return local.as_unit("s").asi8.astype(np.float64)
+    except (ValueError, UnicodeEncodeError):
+        pass
+    return np.fromiter((_to_utc(t).timestamp() for t in times), dtype=np.float64, count=len(times))
+
+def _fetch_pvgis(
     lat: float,
     lon: float,
     peak_kwp: float,
@@ -41,11 +72,8 @@ def fetch_pvgis_series(
     start_year: int,
     end_year: int,
     use_horizon: int = 1,
-) -> Dict[str, object]:
-    """
-    Calls PVGIS 'seriescalc' to get HOURLY PV output for the given years and system.
-    Returns dict with metadata + points: [{"ts": utc_dt, "pv_kw": float}, ...]
-    """
+) -> Tuple[Dict[str, str], Dict[str, object], np.ndarray, np.ndarray]:
+    """One PVGIS 'seriescalc' call → (params, json, ts unix seconds, pv_kw), sorted by ts."""
     params = {
         "lat": f"{lat:.6f}",
         "lon": f"{lon:.6f}",
@@ -62,29 +90,77 @@ def fetch_pvgis_series(
         "mountingplace": "free",
         "raddatabase": "PVGIS-SARAH3",
     }
-    sess = _session()
-    r = sess.get(PVGIS_BASE, params=params, timeout=60)
+    r = _SESSION.get(PVGIS_BASE, params=params, timeout=60)
     if r.status_code >= 400:
         raise RuntimeError(f"PVGIS {r.status_code} {r.url}\n{r.text[:600]}")
 
     js = r.json()
     hourly = js.get("outputs", {}).get("hourly", [])
-    points: List[Dict[str, object]] = []
-    for row in hourly:
-        ts = _to_utc(row["time"])
-        if "P" not in row:
-            raise RuntimeError("PVGIS response missing 'P' — set pvcalculation=1 and provide peakpower & loss")
-        p_w = float(row["P"])
-        points.append({"ts": ts, "pv_kw": p_w / 1000.0})
-    points.sort(key=lambda x: x["ts"])
+    try:
+        p_kw = np.fromiter((float(row["P"]) for row in hourly), dtype=np.float64, count=len(hourly)) / 1000.0
+    except KeyError:
+        raise RuntimeError("PVGIS response missing 'P' — set pvcalculation=1 and provide peakpower & loss")
+    ts = _times_to_unix([row["time"] for row in hourly])
+    if len(ts) > 1 and (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        ts, p_kw = ts[order], p_kw[order]
+    return params, js, ts, p_kw
+
+def _points(ts: np.ndarray, p_kw: np.ndarray) -> List[Dict[str, object]]:
+    return [{"ts": datetime.fromtimestamp(t, tz=timezone.utc), "pv_kw": p}
+            for t, p in zip(ts.tolist(), p_kw.tolist())]
+
+def fetch_pvgis_series(
+    lat: float,
+    lon: float,
+    peak_kwp: float,
+    tilt_deg: float,
+    azimuth_deg: float,
+    losses_pct: float,
+    start_year: int,
+    end_year: int,
+    use_horizon: int = 1,
+) -> Dict[str, object]:
+    """
+    Calls PVGIS 'seriescalc' to get HOURLY PV output for the given years and system.
+    Returns dict with metadata + points: [{"ts": utc_dt, "pv_kw": float}, ...]
+    """
+    params, js, ts, p_kw = _fetch_pvgis(
+        lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year, use_horizon
+    )
     return {
         "ok": True,
         "params": params,
         "meta": js.get("meta", {}),
         "inputs": js.get("inputs", {}),
-        "points": points,
+        "points": _points(ts, p_kw),
     }
 
+def historic_pv_arrays(
+        lat: float,
+        lon: float,
+        peak_kwp: float,
+        tilt_deg: float,
+        azimuth_deg: float,
+        losses_pct: float,
+        start_year: int,
+        end_year: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hourly (ts unix seconds, pv_kw) arrays for the year range.
+    Multi-year ranges are fetched one year per request, concurrently, over the pooled session.
+    """
+    years = list(range(int(start_year), int(end_year) + 1))
+    if len(years) <= 1:
+        return _fetch_pvgis(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year)[2:]
+    with ThreadPoolExecutor(max_workers=min(len(years), PVGIS_MAX_PARALLEL)) as pool:
+        parts = list(pool.map(
+            lambda y: _fetch_pvgis(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, y, y)[2:],
+            years,
+        ))
+    # years are disjoint and each part is sorted, so concatenating in year order stays sorted
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
 def historic_pv_kw(
         lat: float,
         lon: float,
@@ -96,6 +172,4 @@ def historic_pv_kw(
         end_year: int,
 ) -> List[Dict[str, object]]:
     """Convenience wrapper: just the list of {ts, pv_kw}."""
-    return fetch_pvgis_series(
-        lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year
-    )["points"]
+    return _points(*historic_pv_arrays(lat, lon, peak_kwp, tilt_deg, azimuth_deg, losses_pct, start_year, end_year))
@@ -1,8 +1,12 @@
 # services/weather.py
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple, Dict, Any, List
-import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import orjson
 
 from zoneinfo import ZoneInfo
 
@@ -22,31 +26,79 @@ def _rows_to_utc(rows: List[dict]) -> List[dict]:
     out.sort(key=lambda x: x["ts"])
     return out
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+def to_ns(dt: datetime) -> int:
+    """Exact unix nanoseconds of an aware datetime (no float rounding)."""
+    return (dt - _EPOCH) // _US * 1000
+
+@dataclass(frozen=True, slots=True)
+class Forecast:
+    """
+    Parsed forecast as parallel read-only arrays (ts_ns = unix nanoseconds, UTC).
+    `rows` keeps the [{"ts", "wind_ms", "wind_kw"}] view for responses.
+    """
+    rows: List[Dict[str, Any]]
+    ts_ns: np.ndarray
+    wind_ms: np.ndarray
+    wind_kw: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "Forecast":
+        n = len(rows)
+        arrays = [np.fromiter((to_ns(r["ts"]) for r in rows), dtype=np.int64, count=n),
+                  np.fromiter((r["wind_ms"] for r in rows), dtype=np.float64, count=n),
+                  np.fromiter((r["wind_kw"] for r in rows), dtype=np.float64, count=n)]
+        for a in arrays:
+            a.flags.writeable = False
+        return cls(rows, *arrays)
+
+    def __len__(self) -> int:
+        return len(self.ts_ns)
+
+def as_forecast(forecast) -> Forecast:
+    """Accept a Forecast or a sorted list of forecast rows."""
+    return forecast if isinstance(forecast, Forecast) else Forecast.from_rows(forecast)
+
+@lru_cache(maxsize=4)
+def _load_cached(path_str: str, mtime_ns: int) -> Forecast:
+    # mtime_ns only keys the cache: a rewritten file gets a fresh entry
+    return Forecast.from_rows(_rows_to_utc(orjson.loads(Path(path_str).read_bytes())))
+
+_EMPTY_FORECAST = Forecast.from_rows([])
+
+def forecast_arrays() -> Forecast:
+    """WEATHER_JSON parsed once per (path, mtime); shared between callers — treat as read-only."""
+    try:
+        mtime = WEATHER_JSON.stat().st_mtime_ns
+    except FileNotFoundError:
+        return _EMPTY_FORECAST
+    return _load_cached(str(WEATHER_JSON), mtime)
+
 def load_forecast() -> List[Dict[str, Any]]:
-    if not WEATHER_JSON.exists():
-        return []
-    with open(WEATHER_JSON, "r", encoding="utf-8") as f:
-        rows = json.load(f)
-    return _rows_to_utc(rows)
+    """
+    Forecast rows from WEATHER_JSON, re-parsed only when the file changes on disk.
+    The returned list is shared between callers — treat it as read-only.
+    """
+    return forecast_arrays().rows
 
 def _bracketing_points(
-    series: List[Dict[str, Any]], ts: datetime
+    fc: Forecast, ts: datetime
 ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     """
     Return the nearest points p0<=ts and p1>=ts for interpolation.
     """
-    if not series:
+    rows = fc.rows
+    if not rows:
         return None, None
-    # assume sorted
-    if ts <= series[0]["ts"]:
-        return None, series[0]
-    if ts >= series[-1]["ts"]:
-        return series[-1], None
-    # binary-ish scan (linear is fine for 48–72 points)
-    for i in range(1, len(series)):
-        if series[i]["ts"] >= ts:
-            return series[i - 1], series[i]
-    return series[-1], None
+    # binary search on the sorted ns axis: first i with ts_ns[i] >= ts
+    i = int(np.searchsorted(fc.ts_ns, to_ns(ts), side="left"))
+    if i == 0:
+        return None, rows[0]
+    if i >= len(rows) or (i == len(rows) - 1 and rows[i]["ts"] == ts):
+        return rows[-1], None
+    return rows[i - 1], rows[i]
 
 def _lerp(a: float, b: float, t: float) -> float:
     return a + (b - a) * t
@@ -56,12 +108,12 @@ def current_power(now_utc: Optional[datetime] = None) -> Dict[str, Any]:
     Returns the current estimated wind power based on forecast,
     linearly interpolated between the two nearest forecast samples.
     """
-    rows = load_forecast()
-    if not rows:
+    fc = forecast_arrays()
+    if not fc.rows:
         return {"available": False, "reason": "no_forecast"}
 
     now = now_utc or datetime.now(timezone.utc)
-    p0, p1 = _bracketing_points(rows, now)
+    p0, p1 = _bracketing_points(fc, now)
 
     # exact match (or before/after edges)
     if p0 and p1 and p0["ts"] == now:
@@ -96,33 +148,14 @@ def current_power(now_utc: Optional[datetime] = None) -> Dict[str, Any]:
     }
 
 # --- Historic power helper ----------------------------------------------------
-from typing import Optional, Dict, Any, List
-from zoneinfo import ZoneInfo
-from datetime import timedelta
-
-EU_CPH = ZoneInfo("Europe/Copenhagen")
-
-def _parse_when(s: Optional[str], default: Optional[datetime] = None) -> Optional[datetime]:
-    """Parse ISO8601; if naive, assume Europe/Copenhagen, then convert to UTC."""
-    if s is None:
-        return default
-    dt = datetime.fromisoformat(s)
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=EU_CPH)
-    return dt.astimezone(timezone.utc)
 
-def _integrate_energy_kwh(points: List[Dict[str, Any]], key: str) -> float:
+def _integrate_energy_kwh(ts_ns: np.ndarray, kw: np.ndarray) -> float:
     """Simple trapezoidal integration over (possibly uneven) time deltas."""
-    if len(points) < 2:
+    if len(kw) < 2:
         return 0.0
-    total = 0.0
-    for i in range(1, len(points)):
-        t0, t1 = points[i-1]["ts"], points[i]["ts"]
-        p0, p1 = float(points[i-1][key]), float(points[i][key])
-        dh = (t1 - t0).total_seconds() / 3600.0
-        if dh > 0:
-            total += 0.5 * (p0 + p1) * dh
-    return total
+    dh = np.diff(ts_ns) / 3.6e12
+    # duplicate timestamps (dh == 0) contribute nothing, as before
+    return float(np.sum(0.5 * (kw[1:] + kw[:-1]) * np.maximum(dh, 0.0)))
 
 def historic_power(
     start_utc: Optional[datetime] = None,
@@ -135,7 +168,8 @@ def historic_power(
     If start/end are None, defaults to last 24 hours ending at now.
     Only includes points <= now (no future).
     """
-    rows = load_forecast()  # [{"ts": UTC datetime, "wind_ms": float, "wind_kw": float}, ...]
+    fc = forecast_arrays()
+    rows = fc.rows  # [{"ts": UTC datetime, "wind_ms": float, "wind_kw": float}, ...]
     if not rows:
         return {"ok": False, "reason": "no_forecast", "points": []}
 
@@ -152,30 +186,27 @@ def historic_power(
     if start_utc >= end_utc:
         return {"ok": True, "points": [], "start_utc": start_utc.isoformat(), "end_utc": end_utc.isoformat()}
 
-    # Filter
-    series = [r for r in rows if start_utc <= r["ts"] <= end_utc]
+    # Filter: [start_utc, end_utc] on the sorted ns axis
+    lo = int(np.searchsorted(fc.ts_ns, to_ns(start_utc), side="left"))
+    hi = int(np.searchsorted(fc.ts_ns, to_ns(end_utc), side="right"))
+    ts_ns, wind_ms, wind_kw = fc.ts_ns[lo:hi], fc.wind_ms[lo:hi], fc.wind_kw[lo:hi]
 
     # Build output points with net
-    pts = []
-    for r in series:
-        wind_kw = float(r["wind_kw"])
-        pts.append({
-            "ts": r["ts"],
-            "wind_ms": float(r["wind_ms"]),
-            "wind_kw": wind_kw,
-            "net_kw": wind_kw - load_kw,
-            "meets_load": wind_kw >= load_kw,
-        })
+    pts = [
+        {"ts": r["ts"], "wind_ms": ms, "wind_kw": kw, "net_kw": net, "meets_load": ok}
+        for r, ms, kw, net, ok in zip(rows[lo:hi], wind_ms.tolist(), wind_kw.tolist(),
+                                      (wind_kw - load_kw).tolist(), (wind_kw >= load_kw).tolist())
+    ]
 
     # Summary stats
     if pts:
-        avg_wind_kw = sum(p["wind_kw"] for p in pts) / len(pts)
-        min_wind_kw = min(p["wind_kw"] for p in pts)
-        max_wind_kw = max(p["wind_kw"] for p in pts)
-        energy_wind_kwh = _integrate_energy_kwh(pts, "wind_kw")
+        avg_wind_kw = float(wind_kw.mean())
+        min_wind_kw = float(wind_kw.min())
+        max_wind_kw = float(wind_kw.max())
+        energy_wind_kwh = _integrate_energy_kwh(ts_ns, wind_kw)
         # Net is just (wind_kw - load_kw) integrated
         # An easy way: integrate wind then subtract load * hours
-        hours = (pts[-1]["ts"] - pts[0]["ts"]).total_seconds() / 3600.0
+        hours = (ts_ns[-1] - ts_ns[0]) / 3.6e12
         energy_net_kwh = energy_wind_kwh - load_kw * max(0.0, hours)
     else:
         avg_wind_kw = min_wind_kw = max_wind_kw = energy_wind_kwh = energy_net_kwh = 0.0
@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict
+import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -25,27 +26,32 @@ TURBINE_RATED_MS = float(os.getenv("TURBINE_RATED_MS", "12.0"))
 TURBINE_CUTIN_MS  = float(os.getenv("TURBINE_CUTIN_MS", "3.0"))
 TURBINE_CUTOUT_MS = float(os.getenv("TURBINE_CUTOUT_MS", "25.0"))
 
-def _session() -> requests.Session:
+def _build_session() -> requests.Session:
     retry = Retry(
         total=5, connect=5, read=5, backoff_factor=0.6,
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET"],
     )
     s = requests.Session()
-    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
+    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=20)
     s.mount("https://", a); s.mount("http://", a)
     return s
 
+# one pooled session per process: keeps TCP/TLS connections alive across requests
+_SESSION = _build_session()
+
 def _headers():
     return {"X-Gravitee-Api-Key": DMI_API_KEY_EDR} if DMI_API_KEY_EDR else {}
 
-def _turbine_kw(v_ms: float) -> float:
-    if v_ms < TURBINE_CUTIN_MS or v_ms >= TURBINE_CUTOUT_MS:
-        return 0.0
-    if v_ms >= TURBINE_RATED_MS:
-        return TURBINE_RATED_KW
-    frac = (v_ms - TURBINE_CUTIN_MS) / max(TURBINE_RATED_MS - TURBINE_CUTIN_MS, 1e-6)
-    return TURBINE_RATED_KW * max(0.0, min(1.0, frac**3))
+def _turbine_kw(v_ms: np.ndarray) -> np.ndarray:
+    """Power curve for a whole array of wind speeds (m/s -> kW)."""
+    kw = np.zeros_like(v_ms)
+    # the cubic only applies between cut-in and rated; float_power is libm pow(), as frac**3 was per value
+    band = (v_ms >= TURBINE_CUTIN_MS) & (v_ms < TURBINE_RATED_MS)
+    frac = (v_ms[band] - TURBINE_CUTIN_MS) / max(TURBINE_RATED_MS - TURBINE_CUTIN_MS, 1e-6)
+    kw[band] = TURBINE_RATED_KW * np.clip(np.float_power(frac, 3), 0.0, 1.0)
+    kw[(v_ms >= TURBINE_RATED_MS) & (v_ms < TURBINE_CUTOUT_MS)] = TURBINE_RATED_KW
+    return kw
 
 def forecast_wind_power(lat: float, lon: float, hours: int = 48) -> List[Dict[str, object]]:
     """
@@ -66,8 +72,7 @@ def forecast_wind_power(lat: float, lon: float, hours: int = 48) -> List[Dict[st
         "f": "CoverageJSON",
     }
 
-    sess = _session()
-    r = sess.get(base, params=params, headers=_headers(), timeout=45)
+    r = _SESSION.get(base, params=params, headers=_headers(), timeout=45)
     if r.status_code >= 400:
         raise RuntimeError(f"DMI EDR {r.status_code} {r.url}\n{r.text[:600]}")
 
@@ -83,11 +88,15 @@ def forecast_wind_power(lat: float, lon: float, hours: int = 48) -> List[Dict[st
     param_key = next(iter(ranges.keys()))
     values = ranges[param_key].get("values", []) or []
 
-    out: List[Dict[str, object]] = []
-    for t_iso, v in zip(tvals, values):
-        ts = datetime.fromisoformat(t_iso.replace("Z", "+00:00")).astimezone(timezone.utc)
-        v_ms = max(0.0, float(v) if v is not None else 0.0)  # units already m/s
-        out.append({"ts": ts, "wind_ms": v_ms, "wind_kw": _turbine_kw(v_ms)})
+    n = min(len(tvals), len(values))
+    # fmax, like max(0.0, v), turns a NaN reading into 0.0
+    v_ms = np.fmax(0.0, np.fromiter((0.0 if v is None else v for v in values[:n]),
+                                    dtype=np.float64, count=n))  # units already m/s
+    out: List[Dict[str, object]] = [
+        {"ts": datetime.fromisoformat(t_iso.replace("Z", "+00:00")).astimezone(timezone.utc),
+         "wind_ms": v, "wind_kw": kw}
+        for t_iso, v, kw in zip(tvals, v_ms.tolist(), _turbine_kw(v_ms).tolist())
+    ]
     out.sort(key=lambda r: r["ts"])
 
     # Clip in case the model returns more than requested
@@ -1,8 +1,11 @@
 # api/services/wind_live.py
 from __future__ import annotations
-import os, math
+import os, math, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -16,6 +19,9 @@ EU_CPH = ZoneInfo("Europe/Copenhagen")
 DMI_BASE = os.getenv("DMI_METOBS_BASE", "https://dmigw.govcloud.dk/v2/metObs").rstrip("/")
 DMI_API_KEY = os.getenv("DMI_API_KEY_METOBS", os.getenv("DMI_API_KEY_EDR", "")).strip()
 DMI_PARAM_ID = os.getenv("DMI_PARAM_ID", "wind_speed_past1h").strip()
+DMI_CHUNK_DAYS = float(os.getenv("DMI_CHUNK_DAYS", "7"))        # time span per metObs walk (<= 0: one walk)
+DMI_MAX_PARALLEL = max(1, int(os.getenv("DMI_MAX_PARALLEL", "4")))  # concurrent walks (DMI rate limits)
+DMI_STATIONS_TTL_S = float(os.getenv("DMI_STATIONS_TTL_H", "24")) * 3600.0  # station catalog refresh
 
 # Turbine params (same semantics as your script)
 TURBINE_RATED_KW = float(os.getenv("TURBINE_RATED_KW", "3.0"))
@@ -23,7 +29,7 @@ TURBINE_RATED_MS = float(os.getenv("TURBINE_RATED_MS", "12.0"))
 TURBINE_CUTIN_MS  = float(os.getenv("TURBINE_CUTIN_MS", "3.0"))
 TURBINE_CUTOUT_MS = float(os.getenv("TURBINE_CUTOUT_MS", "25.0"))
 
-def _session() -> requests.Session:
+def _build_session() -> requests.Session:
     retry = Retry(total=5, connect=5, read=5, backoff_factor=0.8,
                   status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"],
                   raise_on_status=False)
@@ -32,46 +38,92 @@ def _session() -> requests.Session:
     s.mount("https://", a); s.mount("http://", a)
     return s
 
-def _hav_km(lat1, lon1, lat2, lon2) -> float:
-    R = 6371.0
-    p1, p2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlmb = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(p1)*math.cos(p2)*math.sin(dlmb/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
+# one pooled session per process: paged metObs walks reuse the same TLS connection
+_SESSION = _build_session()
+
+def _equirect_km2(plat: np.ndarray, plon: np.ndarray, qlat: float, qlon: float) -> np.ndarray:
+    """
+    Squared equirectangular distance (radians², no R) from (qlat, qlon) to the
+    points, all in radians. Ranks like the haversine distance within the few-degree station bbox.
+    """
+    # mid-latitude cos keeps near-ties ordered as haversine orders them
+    dlmb = (plon - qlon) * np.cos(0.5 * (plat + qlat))
+    dphi = plat - qlat
+    return dlmb * dlmb + dphi * dphi
+
+# (fetched at, station ids, [lon, lat] degrees) of every located 'Active' station
+_STATIONS: Optional[Tuple[float, List[str], np.ndarray]] = None
+_STATIONS_LOCK = threading.Lock()
+
+def _load_all_stations() -> Tuple[List[str], np.ndarray]:
+    """
+    The 'Active' metObs station catalog, fetched once and refreshed every
+    DMI_STATIONS_TTL_S, so station lookups cost no network round trip.
+    """
+    global _STATIONS
+    with _STATIONS_LOCK:
+        if _STATIONS is None or time.monotonic() - _STATIONS[0] > DMI_STATIONS_TTL_S:
+            headers = {"X-Gravitee-Api-Key": DMI_API_KEY} if DMI_API_KEY else {}
+            url = f"{DMI_BASE}/collections/station/items"
+            limit, offset = 10000, 0
+            ids: List[str] = []
+            coords: List[List[float]] = []
+            while True:
+                r = _SESSION.get(url, params={"status": "Active", "limit": limit, "offset": offset},
+                                 headers=headers, timeout=(10,60))
+                if r.status_code >= 400:
+                    raise RuntimeError(f"DMI stations {r.status_code} {r.url}\n{r.text[:400]}")
+                feats = r.json().get("features", [])
+                for f in feats:
+                    if f.get("geometry"):
+                        ids.append(f["properties"]["stationId"])
+                        coords.append(f["geometry"]["coordinates"][:2])
+                if len(feats) < limit:
+                    break
+                offset += len(feats)
+            _STATIONS = (time.monotonic(), ids, np.array(coords, dtype=np.float64).reshape(-1, 2))
+        return _STATIONS[1], _STATIONS[2]
 
 def _pick_nearest_station(lat: float, lon: float) -> str:
-    """Find nearest 'Active' station using bbox expansion."""
-    sess = _session()
-    headers = {"X-Gravitee-Api-Key": DMI_API_KEY} if DMI_API_KEY else {}
-    url = f"{DMI_BASE}/collections/station/items"
+    """Find nearest 'Active' station using bbox expansion over the cached catalog."""
+    ids, lonlat = _load_all_stations()
+    slon, slat = lonlat[:, 0], lonlat[:, 1]
+    qlat, qlon = math.radians(lat), math.radians(lon)
     for half_deg in [0.2, 0.4, 0.8, 1.2, 2.0]:
-        bbox = f"{lon-half_deg},{lat-half_deg},{lon+half_deg},{lat+half_deg}"
-        r = sess.get(url, params={"bbox": bbox, "status": "Active", "limit": 1000},
-                     headers=headers, timeout=(10,60))
-        if r.status_code >= 400:
-            raise RuntimeError(f"DMI stations {r.status_code} {r.url}\n{r.text[:400]}")
-        feats = r.json().get("features", [])
-        if feats:
-            items = []
-            for f in feats:
-                if "geometry" in f and f["geometry"]:
-                    sid = f["properties"]["stationId"]
-                    slat = f["geometry"]["coordinates"][1]
-                    slon = f["geometry"]["coordinates"][0]
-                    items.append((sid, slat, slon))
-            if items:
-                best = min(items, key=lambda it: _hav_km(lat, lon, it[1], it[2]))
-                return best[0]
+        inside = np.flatnonzero((slon >= lon-half_deg) & (slon <= lon+half_deg)
+                                & (slat >= lat-half_deg) & (slat <= lat+half_deg))
+        if len(inside):
+            d = _equirect_km2(np.radians(slat[inside]), np.radians(slon[inside]), qlat, qlon)
+            return ids[int(inside[np.argmin(d)])]
     raise RuntimeError("No active DMI stations found near the provided location.")
 
-def _list_wind(station_id: str, start_iso: str, end_iso: str) -> List[Dict[str, object]]:
-    """List wind observations via /collections/observation/items (paged)."""
-    sess = _session()
+def _observed_to_unix(observed: List[str]) -> np.ndarray:
+    """
+    Unix seconds for metObs 'observed' times (UTC, ISO 8601).
+    DMI sends fixed-width 'YYYY-MM-DDTHH:MM:SSZ': NumPy parses those bytes directly;
+    any other ISO 8601 form goes through pandas.
+    """
+    try:
+        b = np.array(observed, dtype="S20")
+        raw = b.view(np.uint8).reshape(-1, 20)
+        if len(b) and len(max(observed, key=len)) == 20 and (raw[:, 19] == ord("Z")).all():
+            return raw[:, :19].copy().view("S19").ravel().astype("datetime64[s]").astype(np.int64).astype(np.float64)
+    except (ValueError, UnicodeEncodeError):
+        pass
+    # whole microseconds / 1e6 gives the same float as datetime.timestamp()
+    return pd.to_datetime(observed, utc=True, format="ISO8601").as_unit("us").asi8 / 1e6
+
+def _list_wind(station_id: str, start_iso: str, end_iso: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wind observations via /collections/observation/items (paged), as
+    (ts unix seconds, wind_ms) arrays sorted by time.
+    """
+    sess = _SESSION
     headers = {"X-Gravitee-Api-Key": DMI_API_KEY} if DMI_API_KEY else {}
     url = f"{DMI_BASE}/collections/observation/items"
     limit, offset = 10000, 0
-    rows: List[Dict[str, object]] = []
+    ts_raw: List[str] = []
+    vals: List[float] = []
     while True:
         params = {
             "stationId": station_id,
@@ -92,14 +144,46 @@ def _list_wind(station_id: str, start_iso: str, end_iso: str) -> List[Dict[str,
             t = props.get("observed")
             if v is None or t is None:
                 continue
-            # observed is UTC time; treat as such
-            ts = datetime.fromisoformat(t.replace("Z", "+00:00")).astimezone(timezone.utc)
-            rows.append({"ts": ts, "wind_ms": float(v)})
+            ts_raw.append(t)
+            vals.append(v)
         if len(feats) < limit:
             break
         offset += len(feats)
-    rows.sort(key=lambda x: x["ts"])
-    return rows
+    ts = _observed_to_unix(ts_raw)
+    order = np.argsort(ts, kind="stable")
+    return ts[order], np.asarray(vals, dtype=np.float64)[order]
+
+def _iso_z(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _list_wind_chunked(station_id: str, start_utc: datetime, end_utc: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    _list_wind over [start, end], split into DMI_CHUNK_DAYS spans walked concurrently.
+    Each span keeps [lo, hi) (the last one [lo, hi]), so an observation on a shared
+    boundary is counted once however the API bounds its interval.
+    DMI_CHUNK_DAYS <= 0 turns the split off: the whole range is one _list_wind walk.
+    """
+    if DMI_CHUNK_DAYS <= 0:
+        return _list_wind(station_id, _iso_z(start_utc), _iso_z(end_utc))
+    step = timedelta(days=DMI_CHUNK_DAYS)
+    bounds = [start_utc]
+    while bounds[-1] + step < end_utc:
+        bounds.append(bounds[-1] + step)
+    bounds.append(end_utc)
+    if len(bounds) <= 2:
+        return _list_wind(station_id, _iso_z(start_utc), _iso_z(end_utc))
+
+    def span(k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ts, wind_ms = _list_wind(station_id, _iso_z(bounds[k]), _iso_z(bounds[k + 1]))
+        keep = ts >= bounds[k].timestamp()
+        if k + 2 < len(bounds):
+            keep &= ts < bounds[k + 1].timestamp()
+        return ts[keep], wind_ms[keep]
+
+    with ThreadPoolExecutor(max_workers=min(len(bounds) - 1, DMI_MAX_PARALLEL)) as pool:
+        parts = list(pool.map(span, range(len(bounds) - 1)))
+    # spans are disjoint and each is sorted, so concatenating in order stays sorted
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
 
 def turbine_kw(v: float) -> float:
     if v < TURBINE_CUTIN_MS or v >= TURBINE_CUTOUT_MS:
@@ -109,6 +193,30 @@ def turbine_kw(v: float) -> float:
     frac = (v - TURBINE_CUTIN_MS) / max(TURBINE_RATED_MS - TURBINE_CUTIN_MS, 1e-6)
     return TURBINE_RATED_KW * max(0.0, min(1.0, frac**3))
 
+def turbine_kw_vec(v: np.ndarray) -> np.ndarray:
+    """turbine_kw over a whole array of wind speeds (m/s -> kW)."""
+    v = np.asarray(v, dtype=np.float64)
+    kw = np.zeros_like(v)
+    # only the cut-in..rated band needs the cubic; the rest of the curve is constant
+    band = (v >= TURBINE_CUTIN_MS) & (v < TURBINE_RATED_MS)
+    frac = (v[band] - TURBINE_CUTIN_MS) / max(TURBINE_RATED_MS - TURBINE_CUTIN_MS, 1e-6)
+    # float_power goes through libm pow() like the scalar frac**3 (numpy's ** 3 multiplies)
+    kw[band] = TURBINE_RATED_KW * np.clip(np.float_power(frac, 3), 0.0, 1.0)
+    kw[(v >= TURBINE_RATED_MS) & (v < TURBINE_CUTOUT_MS)] = TURBINE_RATED_KW
+    return kw
+
+def historic_wind_arrays(
+    lat: float,
+    lon: float,
+    station_id: Optional[str],
+    start_utc: datetime,
+    end_utc: datetime,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ts unix seconds, wind_ms, wind_kw) arrays from DMI metObs for [start,end]."""
+    sid = station_id or _pick_nearest_station(lat, lon)
+    ts, wind_ms = _list_wind_chunked(sid, start_utc, end_utc)
+    return ts, wind_ms, turbine_kw_vec(wind_ms)
+
 def historic_wind_power(
     lat: float,
     lon: float,
@@ -117,14 +225,9 @@ def historic_wind_power(
     end_utc: datetime,
 ) -> List[Dict[str, object]]:
     """Return [{ts, wind_ms, wind_kw}] from DMI metObs for [start,end]."""
-    sid = station_id or _pick_nearest_station(lat, lon)
-    start_iso = start_utc.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    end_iso   = end_utc.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-    rows = _list_wind(sid, start_iso, end_iso)
-    out = []
-    for r in rows:
-        out.append({"ts": r["ts"], "wind_ms": r["wind_ms"], "wind_kw": turbine_kw(r["wind_ms"])})
-    return out
+    ts, wind_ms, wind_kw = historic_wind_arrays(lat, lon, station_id, start_utc, end_utc)
+    return [{"ts": datetime.fromtimestamp(t, tz=timezone.utc), "wind_ms": ms, "wind_kw": kw}
+            for t, ms, kw in zip(ts.tolist(), wind_ms.tolist(), wind_kw.tolist())]
 
 def current_wind_power(lat: float, lon: float, station_id: Optional[str]) -> Dict[str, object]:
     """Return latest available sample as 'current'."""
@@ -1,7 +1,13 @@
 import random
+import numpy as np
 from dataclasses import dataclass
 from typing import Tuple, Optional
-from datetime import datetime, time
+from datetime import datetime
+
+
+# Microgrid window 16:00 .. 23:59:59 as microseconds since midnight (integer compare, no time objects)
+_WINDOW_LO_US = 16 * 3600 * 1_000_000
+_WINDOW_HI_US = (23 * 3600 + 59 * 60 + 59) * 1_000_000
 
 
 @dataclass
@@ -25,7 +31,8 @@ def is_microgrid_window(now: Optional[datetime] = None) -> bool:
     Times later than 23:59:59 are not allowed.
     """
     now = now or datetime.now()
-    return time(16, 0) <= now.time() <= time(23, 59, 59)
+    us = ((now.hour * 60 + now.minute) * 60 + now.second) * 1_000_000 + now.microsecond
+    return _WINDOW_LO_US <= us <= _WINDOW_HI_US
 
 
 def schedule_single(task: Task, enough_wind: bool, threshold_kwh: float, now: Optional[datetime] = None) -> Tuple[
@@ -74,15 +81,22 @@ if __name__ == "__main__":
     print(f"{'Time':<6}| {'Enough Wind':<11} | {'Microgrid Window':<16} | {'Scheduled':<12}")
     print("-" * 55)
 
-for _ in range(10):
-    t_now = random_time_today()
-    enough = simulate_wind_forecast(probability_enough_wind=0.7)
-    microgrid_active = is_microgrid_window(t_now)
-    node, _ = schedule_single(task, enough, threshold, now=t_now)
-
-    if node == "microgrid":
-        status = "Microgrid"
-    else:
-        status = "Simulated"
-
-    print(f"{t_now.strftime('%H:%M')} | {str(enough):<11} | {str(microgrid_active):<16} | {status:<12}")
+    # Draw every check's time and wind outcome up front in three batched calls
+    n_checks = 10
+    rng = np.random.default_rng()
+    hours = rng.integers(0, 24, size=n_checks)
+    minutes = rng.integers(0, 60, size=n_checks)
+    winds = rng.random(n_checks) < 0.7  # same 70% as simulate_wind_forecast above
+    today = datetime.now().replace(second=0, microsecond=0)
+
+    for hour, minute, enough in zip(hours.tolist(), minutes.tolist(), winds.tolist()):
+        t_now = today.replace(hour=hour, minute=minute)
+        microgrid_active = is_microgrid_window(t_now)
+        node, _ = schedule_single(task, enough, threshold, now=t_now)
+
+        if node == "microgrid":
+            status = "Microgrid"
+        else:
+            status = "Simulated"
+
+        print(f"{t_now.strftime('%H:%M')} | {str(enough):<11} | {str(microgrid_active):<16} | {status:<12}")
@@ -1,22 +1,12 @@
 import os, math
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
-DATA = Path("data")
-
-def read_series(path: Path, time_col="time"):
-    if not path.exists():
-        return None
-    df = pd.read_csv(path, parse_dates=[time_col]).sort_values(time_col)
-    return df
+from renewables import load_renewables, write_timeline
 
-def infer_dt_hours(times: pd.Series, default=0.25):
-    if len(times) >= 2:
-        dt = (times.iloc[1] - times.iloc[0]).total_seconds()/3600.0
-        if 0 < dt <= 2.0:
-            return dt
-    return default
+DATA = Path("data")
 
 def watts_from_kwh_year(kwh_year: float) -> float:
     return (kwh_year * 1000.0) / (365.0*24.0)
@@ -25,32 +15,6 @@ def split_eff(roundtrip):
     eta_c = eta_d = math.sqrt(max(min(roundtrip, 0.9999), 0.01))
     return eta_c, eta_d
 
-def merge_gen():
-    wind = read_series(DATA/"weather_wind.csv")
-    solar = read_series(DATA/"solar_pv.csv")
-
-    if wind is None and solar is None:
-        raise SystemExit("No renewables found. Run scripts/fetch_weather.py and scripts/fetch_sun.py first.")
-
-    frames = []
-    if wind is not None:
-        if "wind_kw" not in wind.columns: raise SystemExit("weather_wind.csv must have 'wind_kw'")
-        frames.append(wind[["time","wind_kw"]])
-    if solar is not None:
-        if "pv_kw" not in solar.columns: raise SystemExit("solar_pv.csv must have 'pv_kw'")
-        frames.append(solar[["time","pv_kw"]])
-
-    df = frames[0]
-    for f in frames[1:]:
-        df = pd.merge_asof(df.sort_values("time"), f.sort_values("time"),
-                           on="time", direction="nearest", tolerance=pd.Timedelta("30min"))
-    df = df.fillna(0.0).sort_values("time").reset_index(drop=True)
-    if "wind_kw" not in df.columns: df["wind_kw"]=0.0
-    if "pv_kw" not in df.columns: df["pv_kw"]=0.0
-    df["gen_kw"] = df["wind_kw"].astype(float) + df["pv_kw"].astype(float)
-    df["dt_h"]   = infer_dt_hours(df["time"])
-    return df
-
 def preferred_windows():
     """Return a boolean Series of 'good time to run' (cheap or green) if we have data; else None."""
     price_path = DATA/"elspot_prices.csv"
@@ -58,7 +22,7 @@ def preferred_windows():
     if not price_path.exists():
         return None
 
-    prices = pd.read_csv(price_path, parse_dates=["time_dk"]).rename(columns={"time_dk":"time"}).sort_values("time")
+    prices = pd.read_csv(price_path, parse_dates=["time_dk"], date_format="ISO8601").rename(columns={"time_dk":"time"}).sort_values("time")
     price_col = "price_dkk_per_kwh" if "price_dkk_per_kwh" in prices.columns else (
                 "price_eur_per_kwh" if "price_eur_per_kwh" in prices.columns else None)
     if price_col is None:
@@ -72,7 +36,7 @@ def preferred_windows():
 
     # If we have composite "green" picks, mark those as good too
     if green_path.exists():
-        g = pd.read_csv(green_path, parse_dates=["time"]).sort_values("time")
+        g = pd.read_csv(green_path, parse_dates=["time"], date_format="ISO8601").sort_values("time")
         g["green_pick"] = True
         good = pd.merge_asof(good.sort_values("time"),
                              g[["time","green_pick"]].sort_values("time"),
@@ -83,46 +47,62 @@ def preferred_windows():
 
     return good[["time","good"]]
 
-def simulate(df, cap_kwh, init_soc_kwh, max_c_kw, max_d_kw, eta_rt,
-             fridge_w=None, freezer_w=None):
-    eta_c, eta_d = split_eff(eta_rt)
-    dt_h = float(df["dt_h"].iloc[0])
-
-    # background loads (W -> kW)
-    if fridge_w is None:
-        fridge_w = watts_from_kwh_year(float(os.getenv("FRIDGE_KWH_YEAR","150")))
-    if freezer_w is None:
-        freezer_w = watts_from_kwh_year(float(os.getenv("FREEZER_KWH_YEAR","200")))
-    base_kw = (fridge_w + freezer_w) / 1000.0
-
-    soc = float(init_soc_kwh)
-    rows = []
+def _soc_run(wind, pv, base_kw, dt_h, cap, soc0, max_c, max_d, eta_c, eta_d):
+    """
+    SoC after every step for wind/pv kW arrays against a constant base load.
+    Pure numeric kernel (no pandas); returns (soc_arr, solar_in_kwh, wind_in_kwh).
+    """
+    soc = soc0
+    soc_arr = np.empty(len(wind))
     solar_in_kwh = 0.0
     wind_in_kwh  = 0.0
-    for _, r in df.iterrows():
-        t = r["time"]; wind_kw = float(r["wind_kw"]); pv_kw = float(r["pv_kw"])
+    c_lim = max_c*dt_h*eta_c
+    d_lim = max_d*dt_h/eta_d
+    for i, (wind_kw, pv_kw) in enumerate(zip(wind.tolist(), pv.tolist())):
         gen_kw = wind_kw + pv_kw
         net_kw = gen_kw - base_kw
 
         if net_kw > 0:
-            room = cap_kwh - soc
-            inflow = min(net_kw*dt_h*eta_c, max_c_kw*dt_h*eta_c, max(room,0.0))
+            room = cap - soc
+            inflow = min(net_kw*dt_h*eta_c, c_lim, max(room,0.0))
             # apportion for stats
             share = (pv_kw/gen_kw) if gen_kw>1e-9 else 0.0
             solar_in_kwh += inflow*share
             wind_in_kwh  += inflow*(1.0-share)
             soc += inflow
         elif net_kw < 0:
-            need = min((-net_kw)*dt_h/eta_d, max_d_kw*dt_h/eta_d)
+            need = min((-net_kw)*dt_h/eta_d, d_lim)
             used = min(need, soc)
             soc -= used
 
-        rows.append({"time":t, "soc_kwh":soc, "gen_kw":gen_kw, "base_kw":base_kw,
-                     "wind_kw":wind_kw, "pv_kw":pv_kw})
+        soc_arr[i] = soc
+    return soc_arr, solar_in_kwh, wind_in_kwh
+
+def simulate(df, cap_kwh, init_soc_kwh, max_c_kw, max_d_kw, eta_rt,
+             fridge_w=None, freezer_w=None):
+    eta_c, eta_d = split_eff(eta_rt)
+    dt_h = float(df["dt_h"].iloc[0])
+
+    # background loads (W -> kW)
+    if fridge_w is None:
+        fridge_w = watts_from_kwh_year(float(os.getenv("FRIDGE_KWH_YEAR","150")))
+    if freezer_w is None:
+        freezer_w = watts_from_kwh_year(float(os.getenv("FREEZER_KWH_YEAR","200")))
+    base_kw = (fridge_w + freezer_w) / 1000.0
+
+    # plain column arrays: the SoC recurrence is sequential, but needs no per-row Series
+    t = df["time"].to_numpy()
+    wind = df["wind_kw"].to_numpy(dtype=float)
+    pv = df["pv_kw"].to_numpy(dtype=float)
+    gen = wind + pv
+
+    soc_arr, solar_in_kwh, wind_in_kwh = _soc_run(wind, pv, base_kw, dt_h, cap_kwh, float(init_soc_kwh),
+                                                  max_c_kw, max_d_kw, eta_c, eta_d)
 
-    hist = pd.DataFrame(rows)
-    total_wind_kwh  = (hist["wind_kw"]*dt_h).sum()
-    total_solar_kwh = (hist["pv_kw"]*dt_h).sum()
+    hist = pd.DataFrame({"time":t, "soc_kwh":soc_arr, "gen_kw":gen, "base_kw":base_kw,
+                         "wind_kw":wind, "pv_kw":pv})
+    total_wind_kwh  = (wind*dt_h).sum()
+    total_solar_kwh = (pv*dt_h).sum()
 
     return hist, {
         "dt_minutes": int(dt_h*60),
@@ -136,6 +116,7 @@ def simulate(df, cap_kwh, init_soc_kwh, max_c_kw, max_d_kw, eta_rt,
     }
 
 def cycles_possible_from_soc(soc_kwh, eta_d, power_kw, minutes_per_cycle):
+    """Whole cycles (and their minutes) of a power_kw appliance that soc_kwh can supply."""
     if power_kw <= 0 or minutes_per_cycle <= 0: return 0, 0.0
     e_cycle_kwh = power_kw * (minutes_per_cycle/60.0)
     # discharge losses: battery must provide e_cycle/eta_d
@@ -162,7 +143,7 @@ def main():
         oven     = (float(os.getenv("OVEN_KW","2.2")),      float(os.getenv("OVEN_CYCLE_MIN","45"))),
     )
 
-    df = merge_gen()
+    df = load_renewables()
     hist, meta = simulate(df, cap_kwh, init_soc, max_c_kw, max_d_kw, eta_rt)
 
     # Efficiencies for discharge
@@ -170,6 +151,8 @@ def main():
     dt_h = meta["dt_minutes"]/60.0
     soc  = meta["soc_kwh_now"]
     base_kw = meta["base_kw"]
+    # battery-side draw (kW) to supply base_kw through discharge losses
+    draw_kw = base_kw/eta_d
 
     # 1) Autonomy for fridge+freezer (no other loads)
     #    how many hours battery alone can supply base_kw (respecting discharge cap & efficiency)
@@ -178,11 +161,11 @@ def main():
     else:
         # energy we can deliver per hour limited by discharge cap and efficiency
         max_deliverable_kw = min(base_kw, max_d_kw)  # power limit
-        # energy drawn from battery to supply base_kw for 1h is base_kw/eta_d
-        autonomy_h = soc / (base_kw/eta_d)
+        # energy drawn from battery to supply base_kw for 1h is draw_kw
+        autonomy_h = soc / draw_kw
 
     # 2) Reserve to keep cold appliances alive for reserve_h
-    reserve_kwh = (base_kw/eta_d) * reserve_h
+    reserve_kwh = draw_kw * reserve_h
     usable_surplus_kwh = max(0.0, soc - reserve_kwh)
 
     # 3) Per-appliance cycles from surplus (protecting the reserve)
@@ -214,14 +197,14 @@ def main():
     eta_c, _ = split_eff(eta_rt)
     future = df.iloc[len(hist):].copy()
     if not future.empty and soc < cap_kwh-1e-9:
-        for j, r in future.iterrows():
-            net = float(r["gen_kw"] - base_kw)
-            if net <= 0: continue
-            inflow = min(net*dt_h*eta_c, max_c_kw*dt_h*eta_c, cap_kwh - soc_future)
-            soc_future += inflow
-            if soc_future >= cap_kwh-1e-9:
-                ttf_hours = (j - future.index[0] + 1) * dt_h
-                break
+        # charge-only: SoC is nondecreasing, so "full" is the first step whose running
+        # sum of (rate-capped) inflows reaches cap - the room clamp only acts on that step
+        net = future["gen_kw"].to_numpy(dtype=float) - base_kw
+        inflow = np.where(net > 0, np.minimum(net*dt_h*eta_c, max_c_kw*dt_h*eta_c), 0.0)
+        cum = np.cumsum(np.concatenate(([soc_future], inflow)))[1:]
+        k = int(np.searchsorted(cum, cap_kwh-1e-9, side="left"))
+        if k < len(cum):
+            ttf_hours = (k + 1) * dt_h
 
     # ---- Print summary ----
     print("\n=== Battery + Cold Appliances + Cycles ===")
@@ -249,8 +232,8 @@ def main():
     print(f"\nScheduling advice: {suggestion}")
 
     # Save SOC timeline
-    out_soc = DATA/"battery_soc_from_renewables.csv"
-    hist[["time","soc_kwh","gen_kw","base_kw","wind_kw","pv_kw"]].to_csv(out_soc, index=False)
+    out_soc = write_timeline(hist[["time","soc_kwh","gen_kw","base_kw","wind_kw","pv_kw"]],
+                             DATA/"battery_soc_from_renewables.csv")
     print(f"\nWrote SOC timeline: {out_soc}")
 
 if __name__ == "__main__":
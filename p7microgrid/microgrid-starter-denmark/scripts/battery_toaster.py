@@ -5,82 +5,47 @@ import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 
+from renewables import load_renewables, write_timeline
+
 DATA = Path("data")
 
-def read_series(path: Path, time_col="time", value_col=None):
-    if not path.exists():
-        return None
-    df = pd.read_csv(path, parse_dates=[time_col]).sort_values(time_col)
-    if value_col and value_col not in df.columns:
-        raise SystemExit(f"{path} missing '{value_col}' column. Columns: {list(df.columns)}")
-    return df
-
-def merge_power_sources():
-    wind = read_series(DATA/"weather_wind.csv", time_col="time", value_col=None)
-    solar = read_series(DATA/"solar_pv.csv", time_col="time", value_col=None)
-
-    if wind is None and solar is None:
-        raise SystemExit("No renewables found. Run scripts/fetch_weather.py and scripts/fetch_sun.py first.")
-
-    frames = []
-    if wind is not None:
-        # expect wind_kw
-        if "wind_kw" not in wind.columns:
-            raise SystemExit("weather_wind.csv must have 'wind_kw'")
-        frames.append(wind[["time","wind_kw"]])
-    if solar is not None:
-        if "pv_kw" not in solar.columns:
-            raise SystemExit("solar_pv.csv must have 'pv_kw'")
-        frames.append(solar[["time","pv_kw"]])
-
-    # Outer join then fill missing with 0
-    df = None
-    for f in frames:
-        df = f if df is None else pd.merge_asof(
-            df.sort_values("time"),
-            f.sort_values("time"),
-            on="time", direction="nearest", tolerance=pd.Timedelta("30min")
-        )
-
-    df = df.fillna(0.0).sort_values("time").reset_index(drop=True)
-    if "wind_kw" not in df.columns: df["wind_kw"] = 0.0
-    if "pv_kw" not in df.columns: df["pv_kw"] = 0.0
-    df["gen_kw"] = df["wind_kw"].astype(float) + df["pv_kw"].astype(float)
-
-    # infer step in hours (default 0.25 if irregular)
-    if len(df) >= 2:
-        dt = (df["time"].iloc[1] - df["time"].iloc[0]).total_seconds() / 3600.0
-        if dt <= 0 or dt > 2.0:
-            dt = 0.25
-    else:
-        dt = 0.25
-    df["dt_h"] = dt
-
-    return df
+def charge_only_soc(gen_kw, dt_h, cap_kwh, max_c_kw, eta_c):
+    """
+    SoC (kWh, from empty) after each step when charging from gen_kw only.
+    Each step stores min(gen*dt*eta_c, max_c*dt*eta_c, room); until the first step
+    that the room limits this is a plain cumulative sum, after it the (short) rest
+    is stepped, and once full with no negative inflow left SoC just holds.
+    """
+    # charge power capped by max; what fits in the battery is applied below
+    inflow = np.minimum(gen_kw * dt_h * eta_c, max_c_kw * dt_h * eta_c)
+    soc = np.cumsum(inflow)
+    prev = np.concatenate(([0.0], soc[:-1]))
+    limited = np.flatnonzero(inflow > np.maximum(cap_kwh - prev, 0.0))
+    if len(limited):
+        j = int(limited[0])
+        holds = np.minimum.accumulate(inflow[::-1])[::-1] >= 0.0  # no negative inflow from k on
+        s = float(prev[j])
+        for k in range(j, len(inflow)):
+            s += min(float(inflow[k]), max(cap_kwh - s, 0.0))
+            soc[k] = s
+            if s >= cap_kwh and (k + 1 == len(inflow) or holds[k + 1]):
+                soc[k + 1:] = s
+                break
+    return soc
 
 def simulate_battery(df, cap_kwh, max_c_kw, max_d_kw, eta_roundtrip, print_timeline=False,
                      toaster_kw=1.2, cycle_min=2):
     # Split round-trip into symmetric charge/discharge efficiencies
     eta_c = eta_d = math.sqrt(max(min(eta_roundtrip, 0.9999), 0.01))
 
-    soc = 0.0  # kWh
-    soc_series = []
     toaster_events = []  # (time, 'cycle')
     dt_h = float(df["dt_h"].iloc[0])
 
     # First pass: charge from renewables only, respecting limits
-    for i, row in df.iterrows():
-        gen_kw = float(row["gen_kw"])
-        # charge power capped by max and what fits in the battery over this step
-        room_kwh = cap_kwh - soc
-        max_store_kwh = max(room_kwh, 0.0)
-        cap_from_power_kwh = max_c_kw * dt_h * eta_c
-        inflow_kwh = min(gen_kw * dt_h * eta_c, cap_from_power_kwh, max_store_kwh)
-        soc += inflow_kwh
-        soc_series.append(soc)
+    soc_series = charge_only_soc(df["gen_kw"].to_numpy(dtype=float), dt_h, cap_kwh, max_c_kw, eta_c)
 
     # Available energy for toaster after charging
-    available_kwh = soc
+    available_kwh = float(soc_series[-1]) if len(soc_series) else 0.0
 
     # Compute how many cycles you can run *right now* purely from battery
     cycle_h = cycle_min / 60.0
@@ -122,7 +87,7 @@ if __name__ == "__main__":
     load_dotenv()
 
     # Read renewables
-    df = merge_power_sources()
+    df = load_renewables()
 
     # Config
     cap_kwh = float(os.getenv("BATTERY_MAX_KWH", "10"))
@@ -137,9 +102,8 @@ if __name__ == "__main__":
         toaster_kw=toaster_kw, cycle_min=cycle_min
     )
 
-    # Save a quick CSV with SOC
-    out_soc = DATA/"battery_soc_from_renewables.csv"
-    soc_series.reset_index().to_csv(out_soc, index=False)
+    # Save the SOC timeline
+    out_soc = write_timeline(soc_series.reset_index(), DATA/"battery_soc_from_renewables.csv")
 
     print("\n=== Battery from Renewables (no other loads) ===")
     print(f"Time step: {summary['time_step_minutes']} min")
@@ -0,0 +1,73 @@
+"""CSV IO for the scripts: PyArrow's C++ reader/writer, pandas as fallback (USE_PYARROW_CSV=0)."""
+import csv
+import io
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # pipeline still runs, just on the slower pandas reader/writer
+    pa = None
+
+USE_PYARROW = os.getenv("USE_PYARROW_CSV", "1").strip() == "1"
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    df as CSV bytes (no index), written by PyArrow with to_csv's header, ".0" floats and
+    True/False bools, so it reads back to the same values. It is not byte-for-byte to_csv:
+    floats print in shortest form, so exponents read 1e-7 where to_csv writes 1e-07.
+    PyArrow writes UTC for tz-aware columns where to_csv keeps the offset, and quotes
+    every string; frames with tz-aware columns or strings that need quoting stay on pandas.
+    """
+    def pandas_csv() -> bytes:
+        return df.to_csv(index=False).encode("utf-8")
+
+    tz_aware = any(isinstance(t, pd.DatetimeTZDtype) for t in df.dtypes)
+    if not USE_PYARROW or pa is None or tz_aware:
+        return pandas_csv()
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        col = table.column(i)
+        if pa.types.is_timestamp(field.type) and field.type.unit != "s":
+            # whole-second times print as "2025-03-01 00:00:00", like to_csv, not with ".000000"
+            try:
+                table = table.set_column(i, field.name, col.cast(pa.timestamp("s")))
+            except pa.ArrowInvalid:
+                pass
+        elif pa.types.is_floating(field.type):
+            # PyArrow prints 0.0 as "0"; keep to_csv's ".0" so the column reads back as float
+            text = col.cast(pa.string())
+            integral = pc.match_substring_regex(text, r"^-?[0-9]+$")
+            table = table.set_column(i, field.name, pc.if_else(integral, pc.binary_join_element_wise(text, ".0", ""), text))
+        elif pa.types.is_boolean(field.type):
+            table = table.set_column(i, field.name, pc.if_else(col, "True", "False"))
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            if pc.any(pc.match_substring_regex(col, '[,"\r\n]')).as_py():
+                return pandas_csv()
+
+    # header as to_csv writes it (quoted only where needed), then the unquoted rows
+    head = io.StringIO()
+    csv.writer(head, lineterminator="\n").writerow(str(c) for c in df.columns)
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(table, sink, pacsv.WriteOptions(include_header=False, quoting_style="none"))
+    return head.getvalue().encode("utf-8") + sink.getvalue().to_pybytes()
+
+
+def read_csv(path, parse_dates=()) -> pd.DataFrame:
+    """
+    pd.read_csv(path, parse_dates=parse_dates, date_format="ISO8601") on PyArrow's
+    multi-threaded parser. parse_dates columns are read as text and parsed by pandas,
+    so times (and any UTC offsets) come back as pandas' own reader gives them.
+    """
+    if not USE_PYARROW or pa is None:
+        return pd.read_csv(path, parse_dates=list(parse_dates), date_format="ISO8601")
+    opts = pacsv.ConvertOptions(column_types={c: pa.string() for c in parse_dates})
+    df = pacsv.read_csv(path, convert_options=opts).to_pandas()
+    for c in parse_dates:
+        df[c] = pd.to_datetime(df[c], format="ISO8601")
+    return df
@@ -1,13 +1,18 @@
 # scripts/fetch_co2_intensity.py
 import os, json, math, pandas as pd, numpy as np, requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 DATA = Path("data")
 CO2_OUT = DATA / "co2_intensity.csv"  # time, co2_g_per_kwh
 
+# one keep-alive session for every outbound call from this script
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
 def _from_minstroem(url: str) -> pd.DataFrame:
-    r = requests.get(url, timeout=30)
+    r = SESSION.get(url, timeout=30)
     r.raise_for_status()
     js = r.json()
 
@@ -32,7 +37,11 @@ def _from_minstroem(url: str) -> pd.DataFrame:
     if not co2_col:
         raise ValueError(f"Could not find a CO2 column in MinStrøm response. Columns: {list(df.columns)}")
 
-    df[time_col] = pd.to_datetime(df[time_col])
+    # MinStrøm timestamps are ISO-8601 in practice; only unknown layouts pay for per-cell inference
+    try:
+        df[time_col] = pd.to_datetime(df[time_col], format="ISO8601")
+    except (ValueError, TypeError):
+        df[time_col] = pd.to_datetime(df[time_col])
     df = df.rename(columns={time_col: "time", co2_col: "co2_g_per_kwh"})[["time", "co2_g_per_kwh"]]
     df = df.sort_values("time").reset_index(drop=True)
     return df
@@ -42,11 +51,15 @@ def _from_wind_proxy() -> pd.DataFrame:
     wfile = DATA / "weather_wind.csv"
     if not wfile.exists():
         raise SystemExit("No MINSTROEM_CO2_URL and no data/weather_wind.csv. Run scripts/fetch_weather.py or set MINSTROEM_CO2_URL in .env")
-    w = pd.read_csv(wfile, parse_dates=["time"]).sort_values("time")
-    # normalize wind to [0,1]
-    wind_norm = (w["wind_kw"] - w["wind_kw"].min()) / (w["wind_kw"].max() - w["wind_kw"].min() + 1e-9)
-    # map to a plausible CO2 range [50..400] g/kWh (purely illustrative)
-    co2 = 400.0 - wind_norm * (400.0 - 50.0)
+    w = pd.read_csv(wfile, parse_dates=["time"], date_format="ISO8601").sort_values("time")
+    wind = w["wind_kw"].to_numpy(dtype=float)
+    lo, hi = np.nanmin(wind), np.nanmax(wind)
+    # normalize wind to [0,1], then map to a plausible CO2 range [50..400] g/kWh (purely illustrative);
+    # one scratch buffer updated in place instead of a temporary per operator
+    co2 = np.subtract(wind, lo)
+    co2 /= hi - lo + 1e-9
+    co2 *= 400.0 - 50.0
+    np.subtract(400.0, co2, out=co2)
     return pd.DataFrame({"time": w["time"], "co2_g_per_kwh": co2})
 
 if __name__ == "__main__":
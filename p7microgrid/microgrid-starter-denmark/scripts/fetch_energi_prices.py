@@ -1,13 +1,22 @@
-import os, json, requests, pandas as pd
+import os, json, orjson, requests, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlencode, quote
 from dotenv import load_dotenv
 
+from csv_out import csv_bytes
+from http_cache import conditional_get
+
 EDS_BASE = "https://api.energidataservice.dk/dataset"
 CANDIDATE_DATASETS = ["DayAheadPrices", "Elspotprices"]
 
 REL_START = "now-P2D"     # Danish local time window: 2 days back…
 REL_END   = "now%2BP2D"   # …and 2 days forward (note: + must be %2B)
 
+# one keep-alive session for every outbound call from this script
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
 def build_url(dataset, area, limit=None):
     params = {
         "start": REL_START,
@@ -50,25 +59,42 @@ def compute_dkk_per_kwh(df):
 
     raise ValueError(f"Couldn't find a DKK or EUR price column to compute DKK/kWh. Columns: {list(df.columns)}")
 
+def _fetch_dataset(ds, area):
+    recs = orjson.loads(conditional_get(SESSION, build_url(ds, area, limit=5000), timeout=30)).get("records", [])
+    if not recs:
+        return None
+    # build columns directly (key union in first-seen order, as DataFrame(recs) would)
+    # rather than letting pandas walk the records row by row
+    keys = dict.fromkeys(k for rec in recs for k in rec)
+    df = pd.DataFrame({k: [rec.get(k) for rec in recs] for k in keys})
+    tcol = pick_time_col(df)
+    # output built straight from the three arrays: no column pick / rename copies
+    out = pd.DataFrame({
+        "time_dk": pd.to_datetime(df[tcol], format="ISO8601").to_numpy(),
+        "PriceArea": df["PriceArea"].to_numpy(),
+        "price_dkk_per_kwh": compute_dkk_per_kwh(df).to_numpy(),
+    })
+    out.sort_values("time_dk", kind="mergesort", inplace=True)
+    out.reset_index(drop=True, inplace=True)
+    return out
+
 def fetch_prices(area):
     last_err = None
-    for ds in CANDIDATE_DATASETS:
-        url = build_url(ds, area, limit=5000)
-        try:
-            r = requests.get(url, timeout=30)
-            r.raise_for_status()
-            recs = r.json().get("records", [])
-            if not recs:
+    # Ask every candidate dataset at once but take them in preference order: an empty
+    # DayAheadPrices (e.g. before day-ahead publication) no longer costs a second round trip.
+    pool = ThreadPoolExecutor(max_workers=len(CANDIDATE_DATASETS))
+    try:
+        futs = [(ds, pool.submit(_fetch_dataset, ds, area)) for ds in CANDIDATE_DATASETS]
+        for ds, fut in futs:
+            try:
+                out = fut.result()
+            except Exception as e:
+                last_err = e
                 continue
-            df = pd.DataFrame(recs)
-            tcol = pick_time_col(df)
-            df[tcol] = pd.to_datetime(df[tcol])
-            df["price_dkk_per_kwh"] = compute_dkk_per_kwh(df)
-            out = df[[tcol, "PriceArea", "price_dkk_per_kwh"]].rename(columns={tcol: "time_dk"})
-            return out.sort_values("time_dk").reset_index(drop=True), ds
-        except Exception as e:
-            last_err = e
-            continue
+            if out is not None:
+                return out, ds
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     raise RuntimeError(f"All price dataset attempts failed. Last error: {last_err}")
 
 if __name__ == "__main__":
@@ -76,5 +102,6 @@ if __name__ == "__main__":
     area = (os.getenv("PRICE_AREA") or "DK1").strip().upper()
     df, used = fetch_prices(area)
     out = "data/elspot_prices.csv"
-    df.to_csv(out, index=False)
+    with open(out, "wb") as f:
+        f.write(csv_bytes(df))
     print(f"Wrote {out} ({len(df)} rows) using dataset: {used} (DKK/kWh)")
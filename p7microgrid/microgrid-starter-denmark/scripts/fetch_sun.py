@@ -1,10 +1,23 @@
 import os
 import math
+import numpy as np
+import orjson
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from csv_out import csv_bytes
+from http_cache import conditional_get
+
 OPEN_METEO = "https://api.open-meteo.com/v1/forecast"
+# resolution pandas gives parsed strings (ns on pandas 2, us on 3); solar times keep it so
+# they still merge_asof against the wind series
+_TIME_UNIT = pd.to_datetime(["2000-01-01T00:00"]).unit
+
+# one keep-alive session for every outbound call from this script
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
 def fetch_solar_series(lat, lon, tz="Europe/Copenhagen"):
     """
@@ -26,11 +39,15 @@ def fetch_solar_series(lat, lon, tz="Europe/Copenhagen"):
         "forecast_days": 7,               # near-term forecast
         "timezone": tz,
     }
-    r = requests.get(OPEN_METEO, params=params, timeout=30)
-    r.raise_for_status()
-    js = r.json()
+    # unchanged upstream (304 on the stored ETag / Last-Modified) reuses the cached body
+    js = orjson.loads(conditional_get(SESSION, OPEN_METEO, params=params, timeout=30))
     hourly = js.get("hourly", {})
-    times = pd.to_datetime(hourly.get("time", []))
+    t_vals = hourly.get("time", [])
+    try:
+        # Open-Meteo sends strict ISO 'YYYY-MM-DDTHH:MM', which NumPy parses natively
+        times = pd.DatetimeIndex(np.asarray(t_vals, dtype="datetime64[s]")).as_unit(_TIME_UNIT)
+    except ValueError:
+        times = pd.to_datetime(t_vals)
     if times.empty:
         raise RuntimeError("Open-Meteo returned no hourly times.")
 
@@ -61,12 +78,14 @@ def pv_power_kw(poa_wm2, temp_c, kWp, noct=45.0, gamma_p=-0.004, inv_eff=0.96):
       - Power derate:     Pdc = kWp * (POA/1000) * (1 + gamma_p * (Tcell - 25))
       - AC power:         Pac = Pdc * inv_eff
       - clipped to [0, kWp * inv_eff]
+    Works element-wise on arrays as well as on scalars.
     """
     t_cell = temp_c + (noct - 20.0) / 800.0 * poa_wm2
     p_dc = kWp * (poa_wm2 / 1000.0) * (1.0 + gamma_p * (t_cell - 25.0))
-    p_dc = max(0.0, p_dc)
+    # np.maximum(x, 0.0) keeps max(0.0, x)'s +0.0 for a -0.0 input
+    p_dc = np.maximum(p_dc, 0.0)
     p_ac = p_dc * inv_eff
-    return max(0.0, min(p_ac, kWp * inv_eff))
+    return np.maximum(np.minimum(p_ac, kWp * inv_eff), 0.0)
 
 if __name__ == "__main__":
     load_dotenv()
@@ -78,11 +97,12 @@ if __name__ == "__main__":
     inv_eff = float(os.getenv("PV_INVERTER_EFF", "0.96"))
 
     df = fetch_solar_series(lat, lon, tz="Europe/Copenhagen")
-    df["pv_kw"] = [
-        pv_power_kw(poa, t, kWp, noct=noct, gamma_p=gamma_p, inv_eff=inv_eff)
-        for poa, t in zip(df["poa_wm2"].fillna(0.0), df["temp_c"].fillna(15.0))
-    ]
+    df["pv_kw"] = pv_power_kw(df["poa_wm2"].fillna(0.0).to_numpy(dtype=float),
+                              df["temp_c"].fillna(15.0).to_numpy(dtype=float),
+                              kWp, noct=noct, gamma_p=gamma_p, inv_eff=inv_eff)
 
     out = "data/solar_pv.csv"
-    df.to_csv(out, index=False)
+    with open(out, "wb") as f:
+        f.write(csv_bytes(df))
+    df.to_parquet("data/solar_pv.parquet", compression="zstd", index=False)
     print(f"Wrote {out} ({len(df)} rows)")
@@ -3,6 +3,7 @@ Fetch hourly wind forecast from DMI Forecast EDR and convert to turbine power.
 
 Outputs:
   - data/weather_wind.csv
+  - data/weather_wind.parquet  (same rows, typed; read by the battery scripts)
   - data/weather_wind.json
 
 Env variables (example):
@@ -15,6 +16,8 @@ Env variables (example):
   LON=9.9217
   WEATHER_PAST_HOURS=24
   WEATHER_FWD_HOURS=0
+  DMI_CONCURRENCY=3
+  DMI_FORMAT=CSV   # CSV falls back to CoverageJSON if the collection does not serve it
 
   TURBINE_RATED_KW=3.0
   TURBINE_RATED_MS=12.0
@@ -23,35 +26,33 @@ Env variables (example):
 
   # Optional debugging
   PRINT_URL=0
+  PRETTY_JSON=0   # 1 = indent weather_wind.json for reading by eye
+  USE_PYARROW_CSV=1   # 0 = write the CSV with pandas to_csv
 """
 
+import io
 import os
-import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
 import numpy as np
+import orjson
 import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+from csv_out import csv_bytes
+from turbine import turbine_env, turbine_kw_vec
+from wind_out import wind_json, write_if_changed
+
 
 OUT_CSV = Path("data/weather_wind.csv")
 OUT_JSON = Path("data/weather_wind.json")
 
 
-def turbine_kw(v: float, rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> float:
-    """Simple cubic power curve between cut-in and rated; 0 outside [cut-in, cut-out)."""
-    if v < v_cutin or v >= v_cutout:
-        return 0.0
-    if v >= v_rated:
-        return rated_kw
-    frac = (v - v_cutin) / max(v_rated - v_cutin, 1e-6)
-    return rated_kw * max(0.0, min(1.0, frac ** 3))
-
-
 def parse_dmi_coveragejson(js: dict, param_name: str) -> pd.DataFrame:
     """
     Parse DMI EDR CoverageJSON (position query).
@@ -63,14 +64,7 @@ def parse_dmi_coveragejson(js: dict, param_name: str) -> pd.DataFrame:
     t_vals = axes.get("t", {}).get("values", [])
     rngs = js.get("ranges", {})
 
-    # Try requested key and common aliases (hyphenated forms)
-    candidates = [
-        param_name,
-        param_name.replace("_", "-"),
-        "wind-speed-10m",
-        "wind-speed",
-    ]
-    key = next((k for k in candidates if k in rngs), None)
+    key = next((k for k in _param_candidates(param_name) if k in rngs), None)
     if key is None:
         raise ValueError(f"Parameter '{param_name}' not found in CoverageJSON ranges: {list(rngs.keys())}")
 
@@ -79,11 +73,45 @@ def parse_dmi_coveragejson(js: dict, param_name: str) -> pd.DataFrame:
     if len(t_vals) != len(v) and isinstance(v, list) and all(isinstance(x, list) for x in v):
         v = [x[0] for x in v]
 
-    times = pd.to_datetime(t_vals, utc=True, errors="coerce")
-    df = pd.DataFrame({"time": times, "wind_ms": pd.to_numeric(v, errors="coerce")})
+    return _point_frame(t_vals, v)
+
+
+def parse_dmi_csv(body: bytes, param_name: str) -> pd.DataFrame:
+    """
+    Parse a DMI EDR position response requested with f=CSV.
+    One row per time step: a time column (UTC) and one column per parameter.
+    """
+    raw = pd.read_csv(io.BytesIO(body))
+    t_col = next((c for c in ("time", "datetime", "t") if c in raw.columns), None)
+    key = next((k for k in _param_candidates(param_name) if k in raw.columns), None)
+    if t_col is None or key is None:
+        raise ValueError(f"Parameter '{param_name}' / time not found in CSV columns: {list(raw.columns)}")
+    return _point_frame(raw[t_col].to_numpy(), raw[key].to_numpy())
+
+
+def _param_candidates(param_name: str) -> list[str]:
+    """Requested key and common aliases (hyphenated forms)."""
+    return [
+        param_name,
+        param_name.replace("_", "-"),
+        "wind-speed-10m",
+        "wind-speed",
+    ]
+
 
-    # Convert to Europe/Copenhagen and drop tz to keep pipeline simple
-    df["time"] = df["time"].dt.tz_convert("Europe/Copenhagen").dt.tz_localize(None)
+def _point_frame(t_vals, v) -> pd.DataFrame:
+    """UTC times + raw values -> sorted [time (Europe/Copenhagen naive), wind_ms] without gaps."""
+    # Convert to Europe/Copenhagen and drop tz to keep pipeline simple (one pass on the index)
+    times = pd.DatetimeIndex(pd.to_datetime(t_vals, utc=True, errors="coerce"))
+    times = times.tz_convert("Europe/Copenhagen").tz_localize(None)
+    # values are already numbers (None for gaps -> NaN): no per-element to_numeric coercion
+    wind_ms = np.asarray(v)
+    if wind_ms.dtype.kind not in "biuf":
+        try:
+            wind_ms = wind_ms.astype(np.float64)
+        except (TypeError, ValueError):
+            wind_ms = pd.to_numeric(v, errors="coerce")
+    df = pd.DataFrame({"time": times, "wind_ms": wind_ms})
 
     return df.dropna().sort_values("time").reset_index(drop=True)
 
@@ -106,6 +134,13 @@ def _requests_session() -> requests.Session:
     return s
 
 
+# module-level so repeated fetch_dmi_edr calls (e.g. from a scheduler) share one pool
+SESSION = _requests_session()
+
+# collection URLs that answered f=CSV with an error or a non-CSV body; they get CoverageJSON directly
+_CSV_UNSUPPORTED: set[str] = set()
+
+
 def _iter_time_chunks(start_iso: str, end_iso: str, chunk_hours: int = 48):
     """Yield [start, end] ISO Z pairs split into chunk_hours windows."""
     start = pd.to_datetime(start_iso)
@@ -129,6 +164,9 @@ def fetch_dmi_edr(lat: float, lon: float, start_utc: str, end_utc: str) -> pd.Da
       - hyphenated parameter names
       - retries + longer timeouts
       - 48-hour chunking to keep responses light and avoid gateway timeouts
+      - up to DMI_CONCURRENCY (default 3) chunks in flight at once
+      - f=CSV (two flat columns) when DMI_FORMAT=CSV (default), CoverageJSON otherwise
+        or when the collection does not serve CSV
     """
     api_key = os.getenv("DMI_API_KEY_EDR", "").strip()
     collection = os.getenv("DMI_COLLECTION", "harmonie_dini_sf").strip()
@@ -136,6 +174,8 @@ def fetch_dmi_edr(lat: float, lon: float, start_utc: str, end_utc: str) -> pd.Da
     param = os.getenv("DMI_PARAM", "wind-speed-10m").strip()
     base = os.getenv("DMI_BASE_URL", "https://dmigw.govcloud.dk/v1/forecastedr").strip()
     print_url = os.getenv("PRINT_URL", "0").strip() == "1"
+    concurrency = max(1, int(os.getenv("DMI_CONCURRENCY", "3")))
+    want_csv = os.getenv("DMI_FORMAT", "CSV").strip().upper() == "CSV"
 
     if not api_key:
         raise RuntimeError("DMI_API_KEY missing")
@@ -144,45 +184,58 @@ def fetch_dmi_edr(lat: float, lon: float, start_utc: str, end_utc: str) -> pd.Da
     headers = {"X-Gravitee-Api-Key": api_key}
     timeout = (10, 120)  # (connect, read) seconds
 
-    session = _requests_session()
-    frames: list[pd.DataFrame] = []
+    def get(params: dict) -> requests.Response:
+        if print_url:
+            # Build the prepared URL for visibility
+            prep = requests.Request("GET", url, params=params, headers=headers).prepare()
+            print("DMI GET:", prep.url)
+        return SESSION.get(url, params=params, headers=headers, timeout=timeout, stream=True)
 
-    for s_iso, e_iso in _iter_time_chunks(start_utc, end_utc, chunk_hours=48):
+    def fetch_chunk(window: tuple[str, str]) -> pd.DataFrame:
+        s_iso, e_iso = window
         params = {
             "coords": f"POINT({lon} {lat})",  # NOTE: 'POINT(lon lat)' and crs84
             "crs": "crs84",
             "parameter-name": param,
             "datetime": f"{s_iso}/{e_iso}",
-            "f": "CoverageJSON",
         }
-        if print_url:
-            # Build the prepared URL for visibility
-            prep = requests.Request("GET", url, params=params, headers=headers).prepare()
-            print("DMI GET:", prep.url)
 
-        r = session.get(url, params=params, headers=headers, timeout=timeout)
+        if want_csv and url not in _CSV_UNSUPPORTED:
+            r = get({**params, "f": "CSV"})
+            if r.status_code < 400 and "csv" in r.headers.get("Content-Type", "").lower():
+                try:
+                    return parse_dmi_csv(r.content, param)
+                except ValueError:
+                    pass
+            r.close()
+            _CSV_UNSUPPORTED.add(url)
+
+        r = get({**params, "f": "CoverageJSON"})
         if r.status_code >= 400:
             raise RuntimeError(f"DMI {r.status_code} at {r.url}\nBody: {r.text[:500]}")
-        frames.append(parse_dmi_coveragejson(r.json(), param))
+        # multi-MB CoverageJSON: drain in 64 KiB reads (requests' default is 10 KiB), then orjson
+        body = b"".join(r.iter_content(chunk_size=64 * 1024))
+        return parse_dmi_coveragejson(orjson.loads(body), param)
+
+    # Chunks are independent requests: fetch a few at once (the session's Retry
+    # handles 429 backoff) and keep them in time order for the dedup below.
+    windows = list(_iter_time_chunks(start_utc, end_utc, chunk_hours=48))
+    frames: list[pd.DataFrame] = []
+    if windows:
+        with ThreadPoolExecutor(max_workers=min(len(windows), concurrency)) as pool:
+            frames = list(pool.map(fetch_chunk, windows))
 
     if not frames:
         raise RuntimeError("No data returned from DMI EDR")
 
-    df = pd.concat(frames, ignore_index=True)
-    # Drop duplicates across chunk boundaries, keep earliest
-    df = df.drop_duplicates(subset=["time"]).sort_values("time").reset_index(drop=True)
-    return df
+    # Chunks come back in time order; boundary duplicates are dropped once in main()
+    return pd.concat(frames, ignore_index=True)
 
 
 def add_kw(df: pd.DataFrame) -> pd.DataFrame:
-    rated_kw = float(os.getenv("TURBINE_RATED_KW", "3.0"))
-    v_rated = float(os.getenv("TURBINE_RATED_MS", "12.0"))
-    v_cutin = float(os.getenv("TURBINE_CUTIN_MS", "3.0"))
-    v_cutout = float(os.getenv("TURBINE_CUTOUT_MS", "25.0"))
-    df["wind_kw"] = [
-        turbine_kw(v, rated_kw, v_rated, v_cutin, v_cutout)
-        for v in df["wind_ms"].fillna(0.0)
-    ]
+    rated_kw, v_rated, v_cutin, v_cutout = turbine_env()
+    df["wind_kw"] = turbine_kw_vec(df["wind_ms"].to_numpy(dtype=np.float64, na_value=0.0),
+                                   rated_kw, v_rated, v_cutin, v_cutout)
     return df
 
 
@@ -201,24 +254,24 @@ if __name__ == "__main__":
 
     # DMI only
     df = fetch_dmi_edr(lat, lon, start_utc, end_utc)
+    # Drop duplicates across chunk boundaries (keep earliest), then one stable sort
     df = (
         add_kw(df)
-        .drop_duplicates(subset=["time"])
-        .sort_values("time")
+        .drop_duplicates(subset=["time"], keep="first")
+        .sort_values("time", kind="mergesort")
         .reset_index(drop=True)
     )
 
-    df.to_csv(OUT_CSV, index=False)
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(
-            [
-                {"time": t.isoformat(), "wind_ms": float(ms), "wind_kw": float(kw)}
-                for t, ms, kw in zip(df["time"], df["wind_ms"], df["wind_kw"])
-            ],
-            f,
-            ensure_ascii=False,
-            indent=2,
-        )
-
-    print(f"Wrote {OUT_CSV} & {OUT_JSON}  ({len(df)} rows)")
+    outputs = {
+        OUT_CSV: csv_bytes(df),
+        OUT_CSV.with_suffix(".parquet"): df.to_parquet(compression="zstd", index=False),
+        OUT_JSON: wind_json(df),
+    }
+    # a refresh that brings no new forecast leaves the files (and their mtimes) alone
+    written = [str(p) for p, data in outputs.items() if write_if_changed(p, data)]
+
+    if written:
+        print(f"Wrote {' & '.join(written)}  ({len(df)} rows)")
+    else:
+        print(f"Unchanged: {OUT_CSV} & {OUT_JSON}  ({len(df)} rows)")
     print(f"Range: {df['time'].min()} → {df['time'].max()}")
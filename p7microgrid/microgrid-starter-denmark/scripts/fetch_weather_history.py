@@ -4,6 +4,7 @@ Fetch hourly historical wind observations from DMI metObs and convert to turbine
 
 Writes:
   - data/weather_wind.csv
+  - data/weather_wind.parquet  (same rows, typed; read by the battery scripts)
   - data/weather_wind.json
 
 Env:
@@ -24,48 +25,86 @@ Env:
   TURBINE_RATED_MS=12.0
   TURBINE_CUTIN_MS=3.0
   TURBINE_CUTOUT_MS=25.0
+  WIND_LUT=1      # 0 = evaluate the curve directly instead of the 0.1 m/s lookup table
 
   # Optional
+  DMI_CONCURRENCY=3      # observation requests in flight at once
+  DMI_OBS_CHUNK_DAYS=30  # days per observation time window
   PRINT_URL=0
+  PRETTY_JSON=0   # 1 = indent weather_wind.json for reading by eye
 """
 
-import os, math, json
+import os, time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional, Dict, List
 
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from zoneinfo import ZoneInfo
 
+from csv_out import csv_bytes
+from turbine import turbine_env, turbine_kw_vec
+from wind_out import wind_json, write_if_changed
+
 EU_CPH = ZoneInfo("Europe/Copenhagen")
 OUT_CSV  = Path("data/weather_wind.csv")
 OUT_JSON = Path("data/weather_wind.json")
+STATION_CACHE = Path("data/.station_cache.json")
+STATION_CACHE_TTL_S = 30 * 86400  # stations move / retire rarely
 
 def _session() -> requests.Session:
     retry = Retry(total=5, connect=5, read=5, backoff_factor=0.8,
                   status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"],
                   raise_on_status=False)
     s = requests.Session()
-    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
+    # window and page requests overlap (up to DMI_CONCURRENCY squared in flight): keep a socket
+    # per request and make extra threads wait for one rather than open and drop throwaway sockets
+    a = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=32, pool_block=True)
     s.mount("https://", a); s.mount("http://", a)
     return s
 
-def _haversine_km(lat1, lon1, lat2, lon2) -> float:
+# station lookup and the observation pages share one keep-alive pool
+SESSION = _session()
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; lat2/lon2 may be arrays (one distance per station)."""
     R = 6371.0
-    p1, p2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlmb = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(p1)*math.cos(p2)*math.sin(dlmb/2)**2
-    return 2 * R * math.asin(math.sqrt(a))
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlmb = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi/2)**2 + np.cos(p1)*np.cos(p2)*np.sin(dlmb/2)**2
+    return 2 * R * np.arcsin(np.sqrt(a))
 
 def _pick_nearest_station(base: str, apikey: str, lat: float, lon: float) -> str:
     """
     Query stations near (lat, lon), expanding a bbox until at least one 'Active' station is found.
+    The answer is kept in STATION_CACHE per (base, lat, lon to 3 decimals) for STATION_CACHE_TTL_S,
+    so repeat runs for the same site make no station request.
     """
-    sess = _session()
+    key = f"{base}|{round(lat, 3)},{round(lon, 3)}"
+    try:
+        cache = orjson.loads(STATION_CACHE.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        cache = {}
+    hit = cache.get(key)
+    if hit and time.time() - hit.get("at", 0) < STATION_CACHE_TTL_S:
+        return hit["stationId"]
+
+    station = _query_nearest_station(base, apikey, lat, lon)
+    cache[key] = {"stationId": station, "at": time.time()}
+    STATION_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    STATION_CACHE.write_bytes(orjson.dumps(cache))
+    return station
+
+def _query_nearest_station(base: str, apikey: str, lat: float, lon: float) -> str:
+    sess = SESSION
     headers = {"X-Gravitee-Api-Key": apikey} if apikey else {}
     # start with ~20km box in degrees; expand if needed
     for half_deg in [0.2, 0.4, 0.8, 1.2, 2.0]:
@@ -84,27 +123,42 @@ def _pick_nearest_station(base: str, apikey: str, lat: float, lon: float) -> str
                  feat["geometry"]["coordinates"][0])  # lon
                 for feat in items if "geometry" in feat and feat["geometry"]
             ]
-            best = min(items, key=lambda it: _haversine_km(lat, lon, it[1], it[2]))
-            return best[0]
+            lats = np.array([it[1] for it in items], dtype=np.float64)
+            lons = np.array([it[2] for it in items], dtype=np.float64)
+            return items[int(np.argmin(_haversine_km(lat, lon, lats, lons)))][0]
     raise RuntimeError("No active stations found near the provided location.")
 
+def _chunks(start_iso: str, end_iso: str, days: int) -> List[tuple]:
+    """Split [start, end] into consecutive windows of at most `days` days (ISO Z strings)."""
+    start, end = pd.Timestamp(start_iso), pd.Timestamp(end_iso)
+    inner = pd.date_range(start, end, freq=f"{days}D")[1:]
+    cuts = [start_iso] + [t.strftime("%Y-%m-%dT%H:%M:%SZ") for t in inner if t < end] + [end_iso]
+    return list(zip(cuts[:-1], cuts[1:]))
+
 def _list_observations(base: str, apikey: str, station: str, param_id: str,
                        start_iso: str, end_iso: str, print_url: bool) -> List[Dict]:
     """
-    Page through /observation/items (limit/offset) and collect observations.
+    Collect observations from /observation/items for [start_iso, end_iso].
+    The range is cut into DMI_OBS_CHUNK_DAYS (default 30) windows, fetched
+    DMI_CONCURRENCY (default 3) at a time; a window almost always fits in one
+    10k page, so the server never has to skip past a large offset. A window that
+    does overflow is paged with limit/offset (numberMatched lets those pages go
+    out together). Windows share their boundary instant, so rows are deduped on
+    'observed'.
     NOTE: Do NOT use 'sortorder' — some deployments reject it. We sort locally instead.
     """
-    sess = _session()
+    sess = SESSION
     headers = {"X-Gravitee-Api-Key": apikey} if apikey else {}
     url = f"{base}/collections/observation/items"
-    limit, offset = 10000, 0
-    out: List[Dict] = []
+    limit = 10000
+    concurrency = max(1, int(os.getenv("DMI_CONCURRENCY", "3")))
+    chunk_days = max(1, int(os.getenv("DMI_OBS_CHUNK_DAYS", "30")))
 
-    while True:
+    def get_page(window: tuple, offset: int) -> dict:
         params = {
             "stationId": station,
             "parameterId": param_id,
-            "datetime": f"{start_iso}/{end_iso}",
+            "datetime": f"{window[0]}/{window[1]}",
             "limit": limit,
             "offset": offset,
             # "sortorder": "observed,ASC",  # <-- removed, we’ll sort locally
@@ -113,38 +167,72 @@ def _list_observations(base: str, apikey: str, station: str, param_id: str,
             prep = requests.Request("GET", url, params=params, headers=headers).prepare()
             print("metObs GET:", prep.url)
 
-        r = sess.get(url, params=params, headers=headers, timeout=(10, 90))
+        r = sess.get(url, params=params, headers=headers, timeout=(10, 90), stream=True)
         if r.status_code >= 400:
             raise RuntimeError(f"metObs {r.status_code} {r.url}\n{r.text[:500]}")
 
-        js = r.json()
-        feats = js.get("features", [])
-        if not feats:
-            break
-
-        for f in feats:
-            props = f.get("properties", {})
-            val = props.get("value")
-            obs_time = props.get("observed")
-            if val is None or obs_time is None:
-                continue
-            out.append({"observed": obs_time, "value": float(val)})
+        # 10k-feature pages: drain in 64 KiB reads (requests' default is 10 KiB), then orjson
+        return orjson.loads(b"".join(r.iter_content(chunk_size=64 * 1024)))
+
+    def get_window(window: tuple) -> List[list]:
+        first = get_page(window, 0)
+        total = first.get("numberMatched")
+        pages = [first.get("features", [])]
+        n = offset = len(pages[0])
+        while n == limit:
+            # every offset still to come if the server told us the total, else just the next one
+            offsets = list(range(offset, total, limit)) if isinstance(total, int) and total > offset else [offset]
+            with ThreadPoolExecutor(max_workers=min(len(offsets), concurrency)) as pool:
+                batch = list(pool.map(lambda o: get_page(window, o).get("features", []), offsets))
+            for o, feats in zip(offsets, batch):
+                pages.append(feats)
+                n, offset = len(feats), o + len(feats)
+                if n < limit:
+                    break
+        return pages
+
+    windows = _chunks(start_iso, end_iso, chunk_days)
+    with ThreadPoolExecutor(max_workers=min(len(windows), concurrency)) as pool:
+        per_window = list(pool.map(get_window, windows))
 
-        n = len(feats)
-        if n < limit:
-            break
-        offset += n
+    out: List[Dict] = []
+    seen = set()
+    for pages in per_window:
+        for feats in pages:
+            for f in feats:
+                props = f.get("properties", {})
+                val = props.get("value")
+                obs_time = props.get("observed")
+                if val is None or obs_time is None or obs_time in seen:
+                    continue
+                seen.add(obs_time)
+                out.append({"observed": obs_time, "value": float(val)})
 
     # Local sort by observation time (ascending)
     out.sort(key=lambda x: x["observed"])
     return out
 
 
-def turbine_kw(v: float, rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> float:
-    if v < v_cutin or v >= v_cutout: return 0.0
-    if v >= v_rated: return rated_kw
-    frac = (v - v_cutin) / max(v_rated - v_cutin, 1e-6)
-    return rated_kw * max(0.0, min(1.0, frac**3))
+@lru_cache(maxsize=4)
+def _kw_table(rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> np.ndarray:
+    """turbine_kw at 0.0, 0.1, ..., 30.0 m/s (k/10 is the same double a parsed '5.3' is)."""
+    return turbine_kw_vec(np.arange(301) / 10.0, rated_kw, v_rated, v_cutin, v_cutout)
+
+def turbine_kw_lut(v: np.ndarray, rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> np.ndarray:
+    """
+    turbine_kw_vec by table lookup. metObs reports wind in 0.1 m/s steps, so values sit
+    exactly on the table grid; anything off-grid or above 30 m/s takes the direct curve.
+    """
+    v = np.asarray(v, dtype=np.float64)
+    table = _kw_table(rated_kw, v_rated, v_cutin, v_cutout)
+    idx = np.rint(v * 10.0)
+    on_grid = (idx >= 0) & (idx < len(table)) & (idx / 10.0 == v)
+    if on_grid.all():
+        return table[idx.astype(np.intp)]
+    kw = np.empty_like(v)
+    kw[on_grid] = table[idx[on_grid].astype(np.intp)]
+    kw[~on_grid] = turbine_kw_vec(v[~on_grid], rated_kw, v_rated, v_cutin, v_cutout)
+    return kw
 
 def main():
     from dotenv import load_dotenv
@@ -186,28 +274,26 @@ def main():
     df["time"] = df["time_utc"].dt.tz_convert(EU_CPH).dt.tz_localize(None)
     df["wind_ms"] = df["value"].astype(float)
 
-    rated_kw = float(os.getenv("TURBINE_RATED_KW", "3.0"))
-    v_rated  = float(os.getenv("TURBINE_RATED_MS", "12.0"))
-    v_cutin  = float(os.getenv("TURBINE_CUTIN_MS", "3.0"))
-    v_cutout = float(os.getenv("TURBINE_CUTOUT_MS", "25.0"))
-    df["wind_kw"] = [
-        turbine_kw(v, rated_kw, v_rated, v_cutin, v_cutout)
-        for v in df["wind_ms"].fillna(0.0)
-    ]
+    rated_kw, v_rated, v_cutin, v_cutout = turbine_env()
+    power_curve = turbine_kw_lut if os.getenv("WIND_LUT", "1").strip() == "1" else turbine_kw_vec
+    df["wind_kw"] = power_curve(df["wind_ms"].to_numpy(dtype=np.float64, na_value=0.0),
+                                rated_kw, v_rated, v_cutin, v_cutout)
 
     # Keep only the three columns your services consume
-    out = df[["time", "wind_ms", "wind_kw"]].drop_duplicates(subset=["time"]).sort_values("time")
-
-    # Write
-    out.to_csv(OUT_CSV, index=False)
-    with OUT_JSON.open("w", encoding="utf-8") as f:
-        json.dump(
-            [{"time": t.isoformat(), "wind_ms": float(ms), "wind_kw": float(kw)}
-             for t, ms, kw in out.itertuples(index=False, name=None)],
-            f, ensure_ascii=False, indent=2
-        )
-
-    print(f"Wrote {OUT_CSV} & {OUT_JSON}  ({len(out)} rows)")
+    out = df[["time", "wind_ms", "wind_kw"]].drop_duplicates(subset=["time"], keep="first").sort_values("time", kind="mergesort")
+
+    # Write; files whose bytes would not change are left alone (mtime-keyed readers stay cached)
+    outputs = {
+        OUT_CSV: csv_bytes(out),
+        OUT_CSV.with_suffix(".parquet"): out.to_parquet(compression="zstd", index=False),
+        OUT_JSON: wind_json(out),
+    }
+    written = [str(p) for p, data in outputs.items() if write_if_changed(p, data)]
+
+    if written:
+        print(f"Wrote {' & '.join(written)}  ({len(out)} rows)")
+    else:
+        print(f"Unchanged: {OUT_CSV} & {OUT_JSON}  ({len(out)} rows)")
     print(f"Range: {out['time'].min()} → {out['time'].max()}")
 
 if __name__ == "__main__":
@@ -1,59 +1,78 @@
 # python
 from pathlib import Path
 import importlib.util
-import json
+import os
+import orjson
 import pandas as pd
 import numpy as np
+import matplotlib
+
+# PLOT_SHOW=0: batch mode, render off-screen with Agg and only write the PNG
+SHOW = os.getenv("PLOT_SHOW", "1").strip() == "1"
+if not SHOW:
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-# safely choose a style: prefer seaborn if available, otherwise fallback
-try:
-    plt.style.use("seaborn-whitegrid")
-except Exception:
-    if importlib.util.find_spec("seaborn") is not None:
-        import seaborn as sns
-        plt.style.use("seaborn")
-    else:
-        plt.style.use("default")
-
-# compute path relative to this script
-data_file = Path(__file__).resolve().parent.parent / "data" / "etsmartplug_instantaneousdemand.json"
-if not data_file.exists():
-    raise FileNotFoundError(f"Data file not found: {data_file}")
-
-with data_file.open("r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# build DataFrame and keep original unix timestamps (no conversion)
-cols = data["cols"]
-df = pd.DataFrame(data["rows"], columns=cols)
-
-# ensure numeric types
-instantaneousdemand = "instantaneousdemand"
-df[("%s" % instantaneousdemand)] = pd.to_numeric(df[instantaneousdemand], errors="coerce")
-df["timeinstant"] = pd.to_numeric(df["timeinstant"], errors="coerce")
-
-# drop bad rows and sort by the unix timestamp (kept as-is)
-df = df.dropna(subset=[instantaneousdemand, "timeinstant"]).sort_values("timeinstant")
-
-# aggregate identical timestamps (many identical ms entries)
-df_ts = df.groupby("timeinstant")[instantaneousdemand].mean().sort_index()
-
-# detect spikes using z-score
-mean = df_ts.mean()
-std = df_ts.std()
-z = (df_ts - mean) / std
-threshold = 2.0
-spikes = df_ts[z.abs() > threshold]
-
-# plot keeping original unix timestamps on x-axis
-plt.figure(figsize=(12, 5))
-plt.plot(df_ts.index, df_ts.values, label=("%s (aggregated by timeinstant)" % instantaneousdemand), lw=1)
-plt.scatter(spikes.index, spikes.values, color="red", s=30, label=f"spikes (|z|>{threshold})")
-plt.xlabel("unix timestamp (ms) — kept original")
-plt.ylabel("reactive power")
-plt.title("Reactive power time series (original unix timestamps)")
-plt.legend()
-plt.tight_layout()
-plt.savefig("%s_spikes_unix_ts.png" % instantaneousdemand, dpi=150)
-plt.show()
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def _set_style():
+    # safely choose a style: prefer seaborn if available, otherwise fallback
+    try:
+        plt.style.use("seaborn-whitegrid")
+    except Exception:
+        if importlib.util.find_spec("seaborn") is not None:
+            import seaborn as sns
+            plt.style.use("seaborn")
+        else:
+            plt.style.use("default")
+
+
+# once per process, not per plot
+_set_style()
+
+
+def plot_metric(json_path: Path, column: str, out_png: Path, threshold: float = 2.0):
+    """Plot one smart-plug metric against its unix timestamps and mark |z| > threshold spikes."""
+    if not json_path.exists():
+        raise FileNotFoundError(f"Data file not found: {json_path}")
+
+    data = orjson.loads(json_path.read_bytes())
+
+    # build DataFrame and keep original unix timestamps (no conversion)
+    df = pd.DataFrame(data["rows"], columns=data["cols"])
+
+    # ensure numeric types
+    v = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+    ts = pd.to_numeric(df["timeinstant"], errors="coerce").to_numpy(dtype=float)
+
+    # drop bad rows (unix timestamps kept as-is)
+    ok = ~(np.isnan(v) | np.isnan(ts))
+    v, ts = v[ok], ts[ok]
+
+    # aggregate identical timestamps (many identical ms entries): np.unique sorts them,
+    # bincount sums per timestamp, so no groupby hash table
+    ts_u, inv = np.unique(ts, return_inverse=True)
+    means = np.bincount(inv, weights=v) / np.bincount(inv)
+
+    # detect spikes using z-score (sample std, as pandas .std())
+    z = (means - means.mean()) / means.std(ddof=1)
+    is_spike = np.abs(z) > threshold
+
+    # plot keeping original unix timestamps on x-axis
+    plt.figure(figsize=(12, 5))
+    plt.plot(ts_u, means, label=("%s (aggregated by timeinstant)" % column), lw=1, rasterized=True)
+    plt.scatter(ts_u[is_spike], means[is_spike], color="red", s=30, label=f"spikes (|z|>{threshold})")
+    plt.xlabel("unix timestamp (ms) — kept original")
+    plt.ylabel("reactive power")
+    plt.title("Reactive power time series (original unix timestamps)")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(out_png, dpi=150)
+
+
+if __name__ == "__main__":
+    plot_metric(DATA_DIR / "etsmartplug_instantaneousdemand.json", "instantaneousdemand",
+                Path("instantaneousdemand_spikes_unix_ts.png"))
+    if SHOW:
+        plt.show()
@@ -9,36 +9,38 @@ if not os.path.exists(prices_path):
 if not os.path.exists(co2_path):
     raise SystemExit("Run scripts/fetch_co2_intensity.py first.")
 
-P = pd.read_csv(prices_path, parse_dates=["time_dk"]).rename(columns={"time_dk":"time"}).sort_values("time")
+P = pd.read_csv(prices_path, parse_dates=["time_dk"], date_format="ISO8601").rename(columns={"time_dk":"time"}).sort_values("time")
 if "price_dkk_per_kwh" not in P.columns:
     raise SystemExit("Expected price_dkk_per_kwh in prices CSV.")
-C = pd.read_csv(co2_path, parse_dates=["time"]).sort_values("time")
+C = pd.read_csv(co2_path, parse_dates=["time"], date_format="ISO8601").sort_values("time")
 
 # 15-min merge
 df = pd.merge_asof(P[["time","price_dkk_per_kwh"]], C[["time","co2_g_per_kwh"]], on="time",
                    direction="nearest", tolerance=pd.Timedelta("30min"))
-df = df.dropna(subset=["price_dkk_per_kwh", "co2_g_per_kwh"]).copy()
+df = df.dropna(subset=["price_dkk_per_kwh", "co2_g_per_kwh"])
 
-# normalize both to 0..1 (lower is better for both)
-p = df["price_dkk_per_kwh"]
-c = df["co2_g_per_kwh"]
-p_norm = (p - p.min()) / (p.max() - p.min() + 1e-9)
-c_norm = (c - c.min()) / (c.max() - c.min() + 1e-9)
+def norm01(x):
+    return (x - x.min()) / (np.ptp(x) + 1e-9) if len(x) else x
+
+# normalize both to 0..1 (lower is better for both), on the raw arrays
+p_norm = norm01(df["price_dkk_per_kwh"].to_numpy(dtype=float))
+c_norm = norm01(df["co2_g_per_kwh"].to_numpy(dtype=float))
 
 w_price = float(os.getenv("PRICE_WEIGHT", "0.5"))
 w_co2   = float(os.getenv("CO2_WEIGHT", "0.5"))
 w_sum   = max(w_price + w_co2, 1e-9)
 w_price /= w_sum; w_co2 /= w_sum
 
-df["score"] = w_price * p_norm + w_co2 * c_norm  # lower is better
+score = w_price * p_norm + w_co2 * c_norm  # lower is better
 
-# select best N slots or by quantile
+# select best N slots or by quantile; only the kept rows are copied out
 keep_q = float(os.getenv("GREEN_PERCENTILE", "0.2"))
-cut = df["score"].quantile(keep_q)
-best = df[df["score"] <= cut].copy()
+cut = np.quantile(score, keep_q) if len(score) else np.nan
+keep = score <= cut
 
-# save a neat schedule
-out = best[["time", "price_dkk_per_kwh", "co2_g_per_kwh", "score"]].sort_values("time")
+# save a neat schedule (rows are already in time order from the merge)
+out = df.loc[keep, ["time", "price_dkk_per_kwh", "co2_g_per_kwh"]]
+out["score"] = score[keep]
 out_path = "data/green_schedule.csv"
 out.to_csv(out_path, index=False)
 
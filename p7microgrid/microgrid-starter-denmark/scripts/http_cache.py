@@ -0,0 +1,41 @@
+"""Conditional GETs (ETag / Last-Modified) for the fetch scripts, bodies kept under data/.http_cache."""
+import hashlib
+import json
+from pathlib import Path
+
+import requests
+
+CACHE_DIR = Path("data/.http_cache")
+
+
+def conditional_get(session: requests.Session, url: str, params=None, timeout=30) -> bytes:
+    """
+    GET url and return the response body. A previously stored ETag / Last-Modified
+    is sent back as If-None-Match / If-Modified-Since; on 304 the stored body is
+    reused, so an unchanged upstream costs no download and no re-parse of new bytes.
+    """
+    full = requests.Request("GET", url, params=params).prepare().url
+    key = hashlib.sha1(full.encode("utf-8")).hexdigest()
+    meta_path, body_path = CACHE_DIR / f"{key}.json", CACHE_DIR / f"{key}.body"
+
+    headers = {}
+    if meta_path.exists() and body_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = session.get(full, headers=headers, timeout=timeout)
+    if r.status_code == 304 and headers:
+        return body_path.read_bytes()
+    r.raise_for_status()
+
+    validators = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+    if any(validators.values()):
+        if not CACHE_DIR.exists():
+            CACHE_DIR.mkdir(parents=True)
+            (CACHE_DIR / ".gitignore").write_text("*\n", encoding="utf-8")
+        body_path.write_bytes(r.content)
+        meta_path.write_text(json.dumps(validators), encoding="utf-8")
+    return r.content
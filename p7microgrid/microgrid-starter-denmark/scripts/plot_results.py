@@ -1,7 +1,16 @@
+import os
 import pandas as pd
+import matplotlib
+
+# PLOT_SHOW=0: batch mode, render off-screen with Agg and save instead of opening a window
+SHOW = os.getenv("PLOT_SHOW", "1").strip() == "1"
+if not SHOW:
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from csv_out import read_csv  # pyarrow-backed, same frames as pd.read_csv
+
 prices_path = Path("data/elspot_prices.csv")
 co2_path    = Path("data/co2_intensity.csv")
 wind_path   = Path("data/weather_wind.csv")
@@ -13,13 +22,13 @@ for p in (prices_path, sim_path):
         raise SystemExit("Missing CSVs. Run fetch_energi_prices.py and run_sim.py first.")
 
 # prices (DKK/kWh)
-prices = pd.read_csv(prices_path, parse_dates=["time_dk"]).rename(columns={"time_dk":"time"})[["time","price_dkk_per_kwh"]].sort_values("time")
+prices = read_csv(prices_path, ["time_dk"]).rename(columns={"time_dk":"time"})[["time","price_dkk_per_kwh"]].sort_values("time")
 
 # co2 (optional but recommended)
-co2 = pd.read_csv(co2_path, parse_dates=["time"]).sort_values("time") if co2_path.exists() else None
+co2 = read_csv(co2_path, ["time"]).sort_values("time") if co2_path.exists() else None
 
 # sim
-sim = pd.read_csv(sim_path, parse_dates=["time"]).sort_values("time")
+sim = read_csv(sim_path, ["time"]).sort_values("time")
 
 # merge price + co2
 df = prices.copy()
@@ -31,7 +40,7 @@ fig, ax1 = plt.subplots()
 ax1.set_title("DK Price & CO₂")
 ax1.set_xlabel("Time")
 ax1.set_ylabel("DKK/kWh")
-ax1.plot(df["time"], df["price_dkk_per_kwh"], label="Price (DKK/kWh)")
+ax1.plot(df["time"], df["price_dkk_per_kwh"], label="Price (DKK/kWh)", rasterized=True)
 
 # thresholds for price shading
 cheap_q = df["price_dkk_per_kwh"].quantile(0.25)
@@ -46,28 +55,15 @@ ax1.axhline(exp_q,   linestyle="--")
 if "co2_g_per_kwh" in df.columns and df["co2_g_per_kwh"].notna().any():
     ax2 = ax1.twinx()
     ax2.set_ylabel("CO₂ (g/kWh)")
-    ax2.plot(df["time"], df["co2_g_per_kwh"], label="CO₂ (g/kWh)")
+    ax2.plot(df["time"], df["co2_g_per_kwh"], label="CO₂ (g/kWh)", rasterized=True)
     ax2.grid(False)
 
-# green markers (robust to _x/_y suffixes)
+# green markers: only the schedule's times are needed, the prices are already in df
 if green_path.exists():
-    g = pd.read_csv(green_path, parse_dates=["time"]).sort_values("time")
-    g = g.merge(df[["time", "price_dkk_per_kwh"]], on="time", how="inner")
-
-    # pick whichever price column exists after merge
-    gpcol = None
-    for cand in ["price_dkk_per_kwh", "price_dkk_per_kwh_x", "price_dkk_per_kwh_y"]:
-        if cand in g.columns:
-            gpcol = cand
-            break
-    if gpcol is None:
-        # last resort: any column starting with the base name
-        cands = [c for c in g.columns if c.startswith("price_dkk_per_kwh")]
-        if cands:
-            gpcol = cands[0]
-
-    if gpcol is not None and not g.empty:
-        ax1.scatter(g["time"], g[gpcol], s=25, label="Best (cheap+clean)")
+    g_times = read_csv(green_path, ["time"])["time"]
+    sel = df.loc[df["time"].isin(g_times), ["time", "price_dkk_per_kwh"]]
+    if not sel.empty:
+        ax1.scatter(sel["time"], sel["price_dkk_per_kwh"], s=25, label="Best (cheap+clean)")
 
 
 # legends
@@ -77,4 +73,9 @@ if "co2_g_per_kwh" in df.columns:
     lines += l2; labels += lb2
 ax1.legend(lines, labels, loc="upper left")
 
-fig.autofmt_xdate(); fig.tight_layout(); plt.show()
+fig.autofmt_xdate(); fig.tight_layout()
+if SHOW:
+    plt.show()
+else:
+    fig.savefig("price_co2.png", dpi=150, bbox_inches="tight")
+    print("Wrote price_co2.png")
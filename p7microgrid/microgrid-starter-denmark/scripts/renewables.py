@@ -0,0 +1,92 @@
+"""Wind + solar generation frame shared by the battery scripts."""
+import os
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+
+DATA = Path("data")
+
+# Timelines are written as zstd Parquet; set DATA_CSV=1 to keep writing plain CSV
+WRITE_CSV = os.getenv("DATA_CSV", "0") == "1"
+
+def read_series(path: Path, time_col="time"):
+    # a .parquet sibling already carries typed times: no CSV tokenizing or date parsing.
+    # Only while it is at least as new as the CSV (a pull or another tool may rewrite the CSV)
+    csv_mtime, pq_mtime = _mtime(path)
+    if pq_mtime is not None and (csv_mtime is None or pq_mtime >= csv_mtime):
+        return pd.read_parquet(path.with_suffix(".parquet")).sort_values(time_col)
+    if csv_mtime is None:
+        return None
+    df = pd.read_csv(path, parse_dates=[time_col], date_format="ISO8601").sort_values(time_col)
+    return df
+
+def write_timeline(df: pd.DataFrame, csv_path: Path) -> Path:
+    """Write df next to csv_path as <name>.parquet (zstd), or as csv_path itself when DATA_CSV=1."""
+    if WRITE_CSV:
+        # kWh to 0.1 Wh is plenty; fixed-point formatting beats repr(float), and rows stream out in chunks
+        df.to_csv(csv_path, index=False, float_format="%.4f", chunksize=20000)
+        return csv_path
+    out = csv_path.with_suffix(".parquet")
+    df.to_parquet(out, compression="zstd", compression_level=3, index=False)
+    return out
+
+def infer_dt_hours(times: pd.Series, default=0.25):
+    if len(times) >= 2:
+        dt = (times.iloc[1] - times.iloc[0]).total_seconds()/3600.0
+        if 0 < dt <= 2.0:
+            return dt
+    return default
+
+def join_on_time(left, right, tolerance="30min"):
+    """
+    Nearest-time join of right's columns onto left's rows (merge_asof, within tolerance).
+    When every left time is also a (unique) right time, nearest is the exact match,
+    so a hashed reindex gives the same rows without the asof sort/merge.
+    """
+    if right["time"].is_unique and left["time"].isin(right["time"]).all():
+        vals = right.set_index("time").reindex(left["time"])
+        out = left.copy()
+        for c in vals.columns:
+            out[c] = vals[c].to_numpy()
+        return out
+    return pd.merge_asof(left.sort_values("time"), right.sort_values("time"),
+                         on="time", direction="nearest", tolerance=pd.Timedelta(tolerance))
+
+def _mtime(path: Path):
+    pq = path.with_suffix(".parquet")
+    return tuple(p.stat().st_mtime_ns if p.exists() else None for p in (path, pq))
+
+@lru_cache(maxsize=4)
+def _merged(wind_path: str, wind_mtime, solar_path: str, solar_mtime) -> pd.DataFrame:
+    # the mtimes only key the cache: a rewritten CSV/Parquet gets a fresh entry
+    wind = read_series(Path(wind_path))
+    solar = read_series(Path(solar_path))
+
+    if wind is None and solar is None:
+        raise SystemExit("No renewables found. Run scripts/fetch_weather.py and scripts/fetch_sun.py first.")
+
+    frames = []
+    if wind is not None:
+        if "wind_kw" not in wind.columns: raise SystemExit("weather_wind.csv must have 'wind_kw'")
+        frames.append(wind[["time","wind_kw"]])
+    if solar is not None:
+        if "pv_kw" not in solar.columns: raise SystemExit("solar_pv.csv must have 'pv_kw'")
+        frames.append(solar[["time","pv_kw"]])
+
+    df = frames[0]
+    for f in frames[1:]:
+        df = join_on_time(df, f, tolerance="30min")
+    df = df.fillna(0.0).sort_values("time").reset_index(drop=True)
+    if "wind_kw" not in df.columns: df["wind_kw"]=0.0
+    if "pv_kw" not in df.columns: df["pv_kw"]=0.0
+    df["gen_kw"] = df["wind_kw"].astype(float) + df["pv_kw"].astype(float)
+    df["dt_h"]   = infer_dt_hours(df["time"])
+    return df
+
+def load_renewables() -> pd.DataFrame:
+    """
+    weather_wind + solar_pv (Parquet when present, else CSV) joined on time with gen_kw and dt_h columns.
+    Parsed once per process while the files are unchanged; callers get their own copy.
+    """
+    wind, solar = (DATA/"weather_wind.csv").resolve(), (DATA/"solar_pv.csv").resolve()
+    return _merged(str(wind), _mtime(wind), str(solar), _mtime(solar)).copy()
@@ -0,0 +1,38 @@
+"""Turbine power curve shared by the wind fetch scripts (wind speed in m/s -> kW)."""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+
+def turbine_kw(v: float, rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> float:
+    """Simple cubic power curve between cut-in and rated; 0 outside [cut-in, cut-out)."""
+    if v < v_cutin or v >= v_cutout:
+        return 0.0
+    if v >= v_rated:
+        return rated_kw
+    frac = (v - v_cutin) / max(v_rated - v_cutin, 1e-6)
+    return rated_kw * max(0.0, min(1.0, frac ** 3))
+
+
+def turbine_kw_vec(v: np.ndarray, rated_kw: float, v_rated: float, v_cutin: float, v_cutout: float) -> np.ndarray:
+    """turbine_kw over a whole array of wind speeds, matching it element for element."""
+    v = np.asarray(v, dtype=np.float64)
+    kw = np.zeros_like(v)
+    band = (v >= v_cutin) & (v < v_rated)
+    frac = (v[band] - v_cutin) / max(v_rated - v_cutin, 1e-6)
+    # float_power goes through libm pow() like the scalar frac ** 3 (numpy's ** 3 multiplies)
+    kw[band] = rated_kw * np.clip(np.float_power(frac, 3), 0.0, 1.0)
+    kw[(v >= v_rated) & (v < v_cutout)] = rated_kw
+    return kw
+
+
+@lru_cache(maxsize=None)
+def turbine_env() -> tuple[float, float, float, float]:
+    """(rated_kw, v_rated, v_cutin, v_cutout) from TURBINE_*; parsed on first use, i.e. after load_dotenv()."""
+    return (
+        float(os.getenv("TURBINE_RATED_KW", "3.0")),
+        float(os.getenv("TURBINE_RATED_MS", "12.0")),
+        float(os.getenv("TURBINE_CUTIN_MS", "3.0")),
+        float(os.getenv("TURBINE_CUTOUT_MS", "25.0")),
+    )
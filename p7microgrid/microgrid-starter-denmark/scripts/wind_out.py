@@ -0,0 +1,47 @@
+"""weather_wind output helpers shared by fetch_weather.py and fetch_weather_history.py."""
+import os
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pandas as pd
+
+
+def iso_times(times: pd.Series) -> list[str]:
+    """Timestamp.isoformat() for a whole column of naive or UTC times at once."""
+    tz = times.dt.tz
+    if tz is None or str(tz) == "UTC":
+        t = (times if tz is None else times.dt.tz_localize(None)).to_numpy()
+        secs = t.astype("datetime64[s]")
+        if (secs == t).all():
+            iso = np.datetime_as_string(secs)
+            return (iso if tz is None else np.char.add(iso, "+00:00")).tolist()
+    # other zones or sub-second stamps keep the per-value isoformat()
+    return [t.isoformat() for t in times]
+
+
+def wind_json(df: pd.DataFrame) -> bytes:
+    """
+    The time / wind_ms / wind_kw rows of df as weather_wind.json bytes, compact unless PRETTY_JSON=1.
+    orjson serializes straight to UTF-8 bytes, several times faster than json.dump;
+    each column is converted once up front instead of per cell.
+    """
+    return orjson.dumps(
+        [
+            {"time": t, "wind_ms": ms, "wind_kw": kw}
+            for t, ms, kw in zip(
+                iso_times(df["time"]),
+                df["wind_ms"].to_numpy(dtype=float).tolist(),
+                df["wind_kw"].to_numpy(dtype=float).tolist(),
+            )
+        ],
+        option=orjson.OPT_INDENT_2 if os.getenv("PRETTY_JSON", "0").strip() == "1" else 0,
+    )
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Write data unless path already holds exactly these bytes (an untouched mtime keeps readers' caches warm)."""
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+    path.write_bytes(data)
+    return True
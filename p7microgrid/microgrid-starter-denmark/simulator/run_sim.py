@@ -1,17 +1,35 @@
 # --- top of file (unchanged imports) ---
-import os, yaml, pandas as pd, numpy as np
+import os, sys, yaml, pandas as pd, numpy as np
+from functools import lru_cache
 from dotenv import load_dotenv
 from pymgrid import Microgrid
 from pymgrid.modules import BatteryModule, LoadModule, RenewableModule
 
 ROOT = os.path.dirname(os.path.dirname(__file__))
 
+# the CSV reader/writer live with the fetch scripts: one PyArrow/pandas path, one USE_PYARROW_CSV switch
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+import csv_out
+
+# libyaml's C loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+@lru_cache(maxsize=1)
 def load_config():
+    """configs/microgrid.yaml with ${VARS} expanded; parsed once per process (treat as read-only)."""
     with open(os.path.join(ROOT,"configs","microgrid.yaml")) as f:
-        return yaml.safe_load(os.path.expandvars(f.read()))
+        return yaml.load(os.path.expandvars(f.read()), Loader=_YAML_LOADER)
+
+def read_csv(path, parse_dates=()):
+    """csv_out.read_csv (pd.read_csv(..., date_format="ISO8601") on PyArrow), None if the file is missing."""
+    if not os.path.exists(path):
+        return None
+    return csv_out.read_csv(path, parse_dates)
 
-def read_csv(path, **kw):
-    return pd.read_csv(path, **kw) if os.path.exists(path) else None
+def write_csv(df, path):
+    """df (no index) to path through csv_out.csv_bytes; reads back the same as df.to_csv(path, index=False)."""
+    with open(path, "wb") as f:
+        f.write(csv_out.csv_bytes(df))
 
 def to_naive_local(s):
     s = pd.to_datetime(s)
@@ -19,10 +37,13 @@ def to_naive_local(s):
     return s.dt.tz_convert(None) if getattr(s.dt, "tz", None) is not None else s
 
 def synthesize_load(n, base_kw=8.0):
-    t = np.arange(n); day_frac = (t % 24) / 24.0
-    load = base_kw * (0.6 + 0.4 * (np.sin(2*np.pi*(day_frac-0.2))**2))
+    # one working array updated in place (same values as the expression form, no temporaries)
+    load = (np.arange(n) % 24) / 24.0
+    load -= 0.2; load *= 2*np.pi
+    np.sin(load, out=load); np.square(load, out=load)
+    load *= 0.4; load += 0.6; load *= base_kw
     load += np.random.normal(0, 0.4, size=n)
-    return np.maximum(load, 0.5)
+    return np.maximum(load, 0.5, out=load)
 
 def main():
     load_dotenv(); cfg = load_config()
@@ -33,13 +54,14 @@ def main():
     if prices is None or prices.empty:
         raise SystemExit("Run scripts/fetch_energi_prices.py first.")
     prices = prices.rename(columns={"time_dk": "time"})[["time", "price_dkk_per_kwh"]].sort_values("time")
-    df = prices.copy()
+    # already a fresh frame in time order; merge_asof keeps the left order, so df stays sorted below
+    df = prices
 
     # after df is created from prices ...
     solar = read_csv(os.path.join(ROOT, "data", "solar_pv.csv"), parse_dates=["time"])
     if solar is not None and not solar.empty:
         df = pd.merge_asof(
-            df.sort_values("time"),
+            df,
             solar[["time", "pv_kw"]].sort_values("time"),
             on="time",
             direction="nearest",
@@ -52,7 +74,7 @@ def main():
     wind = read_csv(os.path.join(ROOT, "data", "weather_wind.csv"), parse_dates=["time"])
     if wind is not None and not wind.empty:
         df = pd.merge_asof(
-            df.sort_values("time"),
+            df,
             wind[["time", "wind_kw"]].sort_values("time"),
             on="time",
             direction="nearest",
@@ -79,8 +101,11 @@ def main():
 
 
     # Renewables
+    # one add into one buffer; gaps count as no generation
+    wind_arr = df["wind_kw"].to_numpy(dtype=np.float64, na_value=0.0)
+    pv_arr = df["pv_kw"].to_numpy(dtype=np.float64, na_value=0.0)
     renewable = RenewableModule(
-        time_series=(df["wind_kw"].fillna(0.0) + df["pv_kw"].fillna(0.0)).astype(float).values
+        time_series=np.add(wind_arr, pv_arr, out=np.empty_like(wind_arr))
     )
 
     # Load
@@ -98,37 +123,25 @@ def main():
 
     mg.reset()
 
-    # Price-aware policy using DKK
-    cheap_q = df["price_dkk_per_kwh"].quantile(0.25)
-    exp_q = df["price_dkk_per_kwh"].quantile(0.75)
-
-    rows = []
-    for i in range(n):
-        p = float(df.iloc[i]["price_dkk_per_kwh"])
-        if p <= cheap_q:
-            batt_cmd = 1.0
-        elif p >= exp_q:
-            batt_cmd = 0.0
-        else:
-            batt_cmd = 0.5
-
-        action = {"battery": [batt_cmd]}
-        obs, reward, done, info = mg.step(action)
-
-        log = mg.get_log(drop_singleton_key=True).iloc[-1].to_dict()
-        log["time"] = df.iloc[i]["time"]
-        log["price_dkk_per_kwh"] = p
-        log["wind_kw"] = float(df.iloc[i].get("wind_kw", 0.0))
-        log["batt_cmd"] = batt_cmd
-        rows.append(log)
+    # Price-aware policy using DKK: every command decided up front (cheap -> charge, expensive -> hold)
+    cheap_q, exp_q = df["price_dkk_per_kwh"].quantile([0.25, 0.75])
+    prices_arr = df["price_dkk_per_kwh"].to_numpy(dtype=float)
+    batt_cmd = np.select([prices_arr <= cheap_q, prices_arr >= exp_q], [1.0, 0.0], default=0.5)
+
+    for bc in batt_cmd:
+        obs, reward, done, info = mg.step({"battery": [float(bc)]})
         if done: break
 
-    out = pd.DataFrame(rows)
+    # one log per step; read it once at the end instead of slicing it after every step
+    out = mg.get_log(drop_singleton_key=True).reset_index(drop=True)
+    out.columns = out.columns.to_flat_index()  # ('battery', 'soc')-style labels, one header row as before
+    steps = len(out)
+    out["time"] = df["time"].to_numpy()[:steps]
+    out["price_dkk_per_kwh"] = prices_arr[:steps]
+    out["wind_kw"] = df["wind_kw"].to_numpy(dtype=float)[:steps]
+    out["batt_cmd"] = batt_cmd[:steps]
     out_path = os.path.join(ROOT, "data", "simulation_log.csv")
-    out.to_csv(out_path, index=False)
-    print(f"Simulation complete. Log: {out_path}")
-
-    out = pd.DataFrame(rows); out_path=os.path.join(ROOT,"data","simulation_log.csv"); out.to_csv(out_path, index=False)
+    write_csv(out, out_path)
     print(f"Simulation complete. Log: {out_path}")
 
 if __name__ == "__main__":